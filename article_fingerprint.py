@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Article Fingerprint - Detecção de artigos duplicados e quase duplicados
+Canonicaliza URLs (a mesma notícia do G1 publicada em caminhos diferentes) e
+compara o texto extraído por SimHash, para não baixar, extrair ou guardar de novo
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from article_store import DEFAULT_STORE_PATH
+from records import Article
+from search_index import tokenize
+
+DEFAULT_FINGERPRINT_PATH = os.environ.get(
+    "PEGN_FINGERPRINT_PATH",
+    os.path.join(os.path.dirname(DEFAULT_STORE_PATH), "pegn_fingerprints.sqlite3")
+)
+
+# Textos cujos SimHash diferem em até MAX_DISTANCE bits são considerados a mesma notícia
+SIMHASH_BITS = 64
+MAX_DISTANCE = 3
+# Tamanho (em termos) dos trechos sobrepostos que alimentam o SimHash
+SHINGLE_SIZE = 3
+# O SimHash é dividido em MAX_DISTANCE + 1 faixas: dois textos a até MAX_DISTANCE bits
+# de distância coincidem em pelo menos uma faixa inteira, que serve de chave de busca
+BANDS = MAX_DISTANCE + 1
+BAND_BITS = SIMHASH_BITS // BANDS
+
+# Por host: padrão cujo primeiro grupo identifica o artigo, independente da seção
+# ("/empreendedorismo/..." e "/sp/.../empreendedorismo/..." levam à mesma notícia)
+CANONICAL_RULES: List[Tuple[str, re.Pattern]] = [
+    ("g1.globo.com", re.compile(r"/(noticia/\d{4}/\d{2}/\d{2}/[^/]+?)(?:\.ghtml)?$")),
+]
+
+# Prefixos e sufixos das versões AMP/móveis
+_AMP_PREFIX = re.compile(r"^/(?:google/)?amp(?=/)")
+_AMP_SUFFIX = re.compile(r"/amp$")
+_CANONICAL_LINK = re.compile(
+    r'<link[^>]+rel=["\']canonical["\'][^>]*href=["\']([^"\']+)["\']'
+    r'|<link[^>]+href=["\']([^"\']+)["\'][^>]*rel=["\']canonical["\']',
+    re.IGNORECASE,
+)
+
+
+def canonicalize_url(url: str) -> str:
+    """Chave canônica da URL: sem esquema, www/m., parâmetros, âncora, AMP e barra final"""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    for prefix in ("www.", "m."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    path = _AMP_SUFFIX.sub("", _AMP_PREFIX.sub("", parts.path)).rstrip("/")
+
+    for rule_host, pattern in CANONICAL_RULES:
+        if host == rule_host:
+            match = pattern.search(path)
+            if match:
+                return f"{host}/{match.group(1)}"
+    return f"{host}{path}"
+
+
+def canonical_link(html: str) -> Optional[str]:
+    """URL declarada em <link rel="canonical"> (sem analisar o documento inteiro)"""
+    match = _CANONICAL_LINK.search(html[:200000])
+    if not match:
+        return None
+    return match.group(1) or match.group(2)
+
+
+def _hash64(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(text: str) -> int:
+    """SimHash de 64 bits sobre trechos de SHINGLE_SIZE termos do texto normalizado"""
+    terms = tokenize(text)
+    if len(terms) < SHINGLE_SIZE:
+        shingles = {" ".join(terms)} if terms else set()
+    else:
+        shingles = {" ".join(terms[i:i + SHINGLE_SIZE]) for i in range(len(terms) - SHINGLE_SIZE + 1)}
+
+    if not shingles:
+        return 0
+
+    # Cada bit fica 1 se a maioria dos hashes dos trechos tiver 1 nele; as representações
+    # binárias são concatenadas e cada uma das 64 colunas é contada com um fatiamento
+    # (o laço é por coluna, não por trecho e bit)
+    bits = "".join(f"{_hash64(shingle):064b}" for shingle in shingles)
+    half = len(shingles) / 2
+    column = "".join("1" if bits[i::SIMHASH_BITS].count("1") > half else "0" for i in range(SIMHASH_BITS))
+    return int(column, 2)
+
+
+def article_simhash(article: Article) -> int:
+    return simhash(f"{article.title}\n{article.content}")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _bands(fingerprint: int) -> List[Tuple[int, int]]:
+    mask = (1 << BAND_BITS) - 1
+    return [(band, fingerprint >> (band * BAND_BITS) & mask) for band in range(BANDS)]
+
+
+def _to_signed(value: int) -> int:
+    # SQLite guarda inteiros de 64 bits com sinal
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+class ArticleFingerprints:
+    def __init__(self, path: str = DEFAULT_FINGERPRINT_PATH, max_distance: int = MAX_DISTANCE):
+        self.path = path
+        self.max_distance = min(max_distance, MAX_DISTANCE)
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                url TEXT PRIMARY KEY,
+                canonical TEXT NOT NULL,
+                simhash INTEGER,
+                duplicate_of TEXT
+            );
+            CREATE INDEX IF NOT EXISTS fingerprints_canonical ON fingerprints (canonical);
+            """
+        )
+        self._db.commit()
+
+        # Em memória: URL canônica -> URL original, duplicata -> original e faixa do SimHash -> {url: simhash}
+        self._canonical: Dict[str, str] = {}
+        self._duplicates: Dict[str, str] = {}
+        self._bands: Dict[Tuple[int, int], Dict[str, int]] = {}
+        self._simhashes: Dict[str, int] = {}
+        for url, canonical, value, duplicate_of in self._db.execute(
+            "SELECT url, canonical, simhash, duplicate_of FROM fingerprints"
+        ):
+            if duplicate_of is not None:
+                self._duplicates[url] = duplicate_of
+                continue
+            self._canonical.setdefault(canonicalize_url(url), url)
+            self._canonical.setdefault(canonical, url)
+            if value is not None:
+                self._index(value & ((1 << 64) - 1), url)
+
+    def __len__(self) -> int:
+        """Artigos originais registrados"""
+        return len(set(self._canonical.values()))
+
+    def __contains__(self, url: str) -> bool:
+        with self._lock:
+            return url in self._duplicates or self._canonical.get(canonicalize_url(url)) == url
+
+    def _index(self, fingerprint: int, url: str):
+        # Artigo registrado de novo (ex.: sync com o acervo, texto alterado): troca as faixas antigas
+        previous = self._simhashes.get(url)
+        if previous == fingerprint:
+            return
+        if previous is not None:
+            for band in _bands(previous):
+                self._bands[band].pop(url, None)
+        self._simhashes[url] = fingerprint
+        for band in _bands(fingerprint):
+            self._bands.setdefault(band, {})[url] = fingerprint
+
+    def _near(self, fingerprint: int, url: str) -> Optional[str]:
+        for band in _bands(fingerprint):
+            for candidate_url, candidate in self._bands.get(band, {}).items():
+                if candidate_url != url and hamming_distance(candidate, fingerprint) <= self.max_distance:
+                    return candidate_url
+        return None
+
+    def _owner(self, keys: Iterable[str], url: str) -> Optional[str]:
+        for key in keys:
+            owner = self._canonical.get(key)
+            if owner is not None and owner != url:
+                return owner
+        return None
+
+    def _register(self, url: str, keys: List[str], fingerprint: int):
+        # Chamado com o lock adquirido; o commit fica com quem chamou
+        for key in keys:
+            self._canonical.setdefault(key, url)
+        self._index(fingerprint, url)
+        self._db.execute(
+            "INSERT OR REPLACE INTO fingerprints (url, canonical, simhash, duplicate_of) VALUES (?, ?, ?, NULL)",
+            (url, keys[-1], _to_signed(fingerprint)),
+        )
+
+    def _mark_duplicate(self, url: str, original: str, fingerprint: Optional[int] = None):
+        # Chamado com o lock adquirido
+        self._duplicates[url] = original
+        self._db.execute(
+            "INSERT OR REPLACE INTO fingerprints (url, canonical, simhash, duplicate_of) VALUES (?, ?, ?, ?)",
+            (url, canonicalize_url(url), None if fingerprint is None else _to_signed(fingerprint), original),
+        )
+        self._db.commit()
+
+    def known_as(self, url: str, html: Optional[str] = None) -> Optional[str]:
+        """URL original da mesma notícia, se já registrada (pela URL canônica ou, com o HTML,
+        pelo rel=canonical declarado); a URL passa a ser lembrada como duplicata"""
+        keys = _canonical_keys(url, html)
+        with self._lock:
+            original = self._duplicates.get(url) or self._owner(keys, url)
+            if original is not None and url not in self._duplicates:
+                self._mark_duplicate(url, original)
+        return original
+
+    def claim(self, article: Article, html: Optional[str] = None) -> Optional[str]:
+        """Registra o artigo extraído; devolve a URL do original se for duplicado ou quase duplicado"""
+        keys = _canonical_keys(article.url, html)
+        fingerprint = article_simhash(article)
+        with self._lock:
+            original = self._owner(keys, article.url) or self._near(fingerprint, article.url)
+            if original is not None:
+                self._mark_duplicate(article.url, original, fingerprint)
+                return original
+            self._register(article.url, keys, fingerprint)
+            self._db.commit()
+        return None
+
+    def add_many(self, articles: Iterable[Article]) -> int:
+        """Registra artigos já guardados no acervo (sem checar duplicidade), em uma transação"""
+        count = 0
+        with self._lock:
+            for article in articles:
+                self._register(article.url, _canonical_keys(article.url), article_simhash(article))
+                count += 1
+            self._db.commit()
+        return count
+
+
+def _canonical_keys(url: str, html: Optional[str] = None) -> List[str]:
+    """Chaves canônicas da URL e, se houver, do rel=canonical declarado no HTML (por último)"""
+    keys = [canonicalize_url(url)]
+    declared = canonical_link(html) if html else None
+    if declared and canonicalize_url(declared) not in keys:
+        keys.append(canonicalize_url(declared))
+    return keys
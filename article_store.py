@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Article Store - Acervo persistente de artigos raspados, indexado pela URL
+Guarda o artigo extraído junto com o hash do HTML, ETag e Last-Modified,
+para que o scraper só baixe e extraia de novo o que mudou
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from records import Article
+
+DEFAULT_STORE_PATH = os.environ.get(
+    "PEGN_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "pegn_articles.sqlite3")
+)
+
+
+class ArticleStore:
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS articles (
+                url TEXT PRIMARY KEY,
+                article TEXT,
+                content_hash TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                article_date TEXT,
+                checked_at REAL NOT NULL
+            )"""
+        )
+        # all_articles(limit=...) lê só os mais recentes pelo índice, sem ordenar o acervo inteiro
+        self._db.execute("CREATE INDEX IF NOT EXISTS articles_date ON articles (article_date)")
+        self._db.commit()
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Registro guardado da URL (artigo, validadores e data da última verificação)"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT article, content_hash, etag, last_modified, checked_at FROM articles WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "article": Article.from_json(row[0]) if row[0] else None,
+            "content_hash": row[1],
+            "etag": row[2],
+            "last_modified": row[3],
+            "checked_at": row[4],
+        }
+
+    def save(self, url: str, article: Optional[Article], content_hash: Optional[str],
+             etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Grava (ou substitui) o artigo; `article=None` registra páginas sem conteúdo útil"""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO articles "
+                "(url, article, content_hash, etag, last_modified, article_date, checked_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    article.to_json() if article else None,
+                    content_hash,
+                    etag,
+                    last_modified,
+                    article.date if article else None,
+                    time.time(),
+                ),
+            )
+            self._db.commit()
+
+    def touch(self, url: str):
+        """Marca a URL como verificada agora, sem alterar o conteúdo"""
+        with self._lock:
+            self._db.execute("UPDATE articles SET checked_at = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+
+    def all_articles(self, limit: Optional[int] = None) -> List[Article]:
+        """Artigos do acervo, do mais recente para o mais antigo"""
+        query = "SELECT article FROM articles WHERE article IS NOT NULL ORDER BY article_date DESC"
+        params: tuple = ()
+        if limit is not None:
+            query += " LIMIT ?"
+            params = (limit,)
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        return [Article.from_json(row[0]) for row in rows]
+
+    def __contains__(self, url: str) -> bool:
+        """URL já verificada alguma vez (com ou sem artigo útil)"""
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM articles WHERE url = ?", (url,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM articles WHERE article IS NOT NULL").fetchone()[0]
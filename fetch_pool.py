@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Fetch Pool - Execução concorrente das chamadas às APIs governamentais
+Limita o número de requisições simultâneas e aplica um prazo total,
+devolvendo resultados parciais para as chamadas que não terminaram.
+Inclui limitadores de taxa compartilhados por serviço e cortesia por host
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+def iter_concurrently(
+    calls: Dict[Hashable, Callable[[], Any]],
+    max_workers: int = 6,
+    deadline: Optional[float] = None,
+) -> Iterator[Tuple[Hashable, Any]]:
+    """Executa as chamadas em paralelo e gera (chave, resultado) na ordem em que terminam
+
+    Chamadas que levantarem exceção ou não terminarem dentro do prazo (em segundos)
+    recebem {"success": False, "error": ...}, no mesmo formato usado pelos fetchers.
+    """
+    if not calls:
+        return
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(calls))))
+    try:
+        futures = {executor.submit(call): key for key, call in calls.items()}
+        pending = set(futures)
+        expires_at = time.monotonic() + deadline if deadline is not None else None
+
+        while pending:
+            remaining = None
+            if expires_at is not None:
+                remaining = expires_at - time.monotonic()
+                if remaining <= 0:
+                    break
+
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = futures[future]
+                try:
+                    yield key, future.result()
+                except Exception as e:
+                    yield key, {"success": False, "error": str(e)}
+
+        for future in pending:
+            yield futures[future], {"success": False, "error": "Prazo total excedido"}
+    finally:
+        # Não espera pelas chamadas atrasadas: o resultado parcial já foi entregue
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def fetch_concurrently(
+    calls: Dict[Hashable, Callable[[], Any]],
+    max_workers: int = 6,
+    deadline: Optional[float] = None,
+) -> Dict[Hashable, Any]:
+    """Executa as chamadas em paralelo e devolve o resultado de cada uma pela chave"""
+    return dict(iter_concurrently(calls, max_workers, deadline))
+
+
+class TokenBucket:
+    """Limitador de taxa (token bucket) compartilhado entre threads
+
+    Permite rajadas de até `capacity` requisições e repõe `rate` fichas por segundo.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        """Bloqueia até haver fichas disponíveis e as consome"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait_for = (tokens - self._tokens) / self.rate
+
+            time.sleep(wait_for)
+
+
+_rate_limiters: Dict[str, TokenBucket] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str, rate: float, capacity: Optional[float] = None) -> TokenBucket:
+    """Devolve o limitador compartilhado de um serviço (ex.: "ibge"), criando-o se necessário"""
+    with _rate_limiters_lock:
+        if name not in _rate_limiters:
+            _rate_limiters[name] = TokenBucket(rate, capacity)
+        return _rate_limiters[name]
+
+
+class HostThrottle:
+    """Cortesia por host: limita requisições simultâneas e impõe intervalo mínimo entre elas"""
+
+    def __init__(self, max_concurrent: int = 3, min_interval: float = 0.25):
+        self.max_concurrent = max_concurrent
+        self.min_interval = min_interval
+        self._hosts: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _host_state(self, host: str) -> tuple:
+        with self._lock:
+            if host not in self._hosts:
+                # (semáforo de concorrência, trava do intervalo, [início da última requisição])
+                self._hosts[host] = (threading.BoundedSemaphore(self.max_concurrent), threading.Lock(), [0.0])
+            return self._hosts[host]
+
+    @contextmanager
+    def slot(self, url: str):
+        """Reserva uma vaga para requisitar `url`, esperando a vez do host se necessário"""
+        semaphore, gap_lock, last_start = self._host_state(urlsplit(url).netloc)
+        with semaphore:
+            with gap_lock:
+                wait_for = last_start[0] + self.min_interval - time.monotonic()
+                if wait_for > 0:
+                    time.sleep(wait_for)
+                last_start[0] = time.monotonic()
+            yield
@@ -0,0 +1,58 @@
+// Cliente do Fetcher Service (fetcher_service.py)
+// Chama os coletores Python que ficam carregados em um processo persistente,
+// evitando iniciar um novo interpretador python3 a cada requisição HTTP.
+const http = require('http');
+
+const FETCHER_SERVICE_HOST = process.env.FETCHER_SERVICE_HOST || '127.0.0.1';
+const FETCHER_SERVICE_PORT = parseInt(process.env.FETCHER_SERVICE_PORT || '3005', 10);
+
+// Reaproveita conexões TCP com o serviço entre chamadas
+const agent = new http.Agent({ keepAlive: true, maxSockets: 16 });
+
+function callFetcherService(method, params = {}, timeoutMs = 15000) {
+    return new Promise((resolve, reject) => {
+        const body = JSON.stringify({ method, params });
+
+        const req = http.request({
+            host: FETCHER_SERVICE_HOST,
+            port: FETCHER_SERVICE_PORT,
+            path: '/rpc',
+            method: 'POST',
+            agent,
+            headers: {
+                'Content-Type': 'application/json',
+                'Content-Length': Buffer.byteLength(body)
+            }
+        }, (res) => {
+            let data = '';
+            res.setEncoding('utf8');
+            res.on('data', (chunk) => { data += chunk; });
+            res.on('end', () => {
+                try {
+                    const response = JSON.parse(data);
+                    if (response.success) {
+                        resolve(response.result);
+                    } else {
+                        reject(new Error(response.error || 'Erro no Fetcher Service'));
+                    }
+                } catch (e) {
+                    reject(new Error('Resposta inválida do Fetcher Service'));
+                }
+            });
+        });
+
+        req.setTimeout(timeoutMs, () => {
+            req.destroy(new Error(`Timeout no Fetcher Service (${method})`));
+        });
+        req.on('error', (error) => {
+            // Serviço não iniciado: quem chamou pode recorrer ao script python3
+            if (error.code === 'ECONNREFUSED') {
+                error.serviceUnavailable = true;
+            }
+            reject(error);
+        });
+        req.end(body);
+    });
+}
+
+module.exports = { callFetcherService };
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Fetcher Service - Serviço persistente dos coletores de dados
+Mantém IBGE, SICONFI, Transparência e PEGN carregados em um único processo
+e expõe seus métodos via JSON-RPC sobre HTTP local
+"""
+
+import inspect
+import os
+import threading
+import time
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+from ibge_fetcher import IBGEDataFetcher
+from siconfi_fetcher import SiconfiDataFetcher
+from transparency_data_fetcher import TransparencyDataFetcher
+from pegn_scraper import PUBLISHED_ARTICLES, PEGNScraper
+from ranking_index import RankingIndex
+from serialization import (
+    JSON_CONTENT_TYPE, MSGPACK_AVAILABLE, MSGPACK_CONTENT_TYPE, dumps_bytes, loads, packb, unpackb
+)
+from refresh_scheduler import DAY, MINUTE, RefreshJob, RefreshScheduler
+from snapshot_store import SnapshotStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 3005
+
+# Cadência de atualização em segundo plano de cada conjunto publicado
+REFRESH_INTERVALS = {
+    "pegn_news": 15 * MINUTE,
+    "municipal_comparison": DAY,
+    "transparency_data": 7 * DAY,
+    "social_data": 7 * DAY,
+}
+
+# Métricas materializadas no índice de rankings a cada atualização do conjunto
+RANKED_METRICS = {
+    "social_data": (["populacao", "pib_per_capita", "idhm", "densidade_dem"], 2024),
+    "municipal_comparison": (["saude", "educacao", "total"], 2023),
+}
+
+
+class FetcherService:
+    def __init__(self):
+        # Instâncias criadas uma única vez e reaproveitadas entre chamadas
+        self.ibge = IBGEDataFetcher()
+        self.siconfi = SiconfiDataFetcher()
+        self.transparency = TransparencyDataFetcher()
+        # Poucos artigos por rodada: a extração roda nas threads de download, sem processos
+        # que ficariam ocupando memória entre as atualizações
+        self.pegn = PEGNScraper(extract_processes=0)
+        self.started_at = time.time()
+        self.methods: Dict[str, Callable[..., Any]] = {
+            "ibge.generate_social_comparison": self.ibge.generate_social_comparison,
+            "ibge.fetch_population_data": self.ibge.fetch_population_data,
+            "ibge.fetch_pib_data": self.ibge.fetch_pib_data,
+            "siconfi.generate_municipal_comparison": self.siconfi.generate_municipal_comparison,
+            "siconfi.fetch_municipal_data": self.siconfi.fetch_municipal_data,
+            "siconfi.fetch_all_municipal_data": self.siconfi.fetch_all_municipal_data,
+            "siconfi.fetch_historical_data": self.siconfi.fetch_historical_data,
+            "siconfi.generate_time_series": self.siconfi.generate_time_series,
+            "siconfi.generate_functional_breakdown": self.siconfi.generate_functional_breakdown,
+            "transparency.generate_transparency_comparison": self.transparency.generate_transparency_comparison,
+            "pegn.fetch_latest_news": self.pegn.fetch_latest_news,
+            "pegn.search_articles": self.pegn.search_articles,
+            "ranking.metrics": self.ranking_metrics,
+            "ranking.top": self.ranking_top,
+            "ranking.municipality": self.ranking_municipality,
+            "refresh.status": self.refresh_status,
+            "refresh.run": self.refresh_run,
+        }
+        self.ranking_store = SnapshotStore("ranking_index")
+        self.rankings = self._load_rankings()
+        self._rankings_lock = threading.Lock()
+        self.scheduler = RefreshScheduler(self._refresh_jobs())
+
+    def _load_rankings(self) -> RankingIndex:
+        try:
+            return RankingIndex.from_dict(self.ranking_store.load() or {})
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Erro ao carregar índice de rankings: {e}")
+            return RankingIndex()
+
+    def _refresh_jobs(self) -> List[RefreshJob]:
+        """Conjuntos pré-calculados lidos diretamente pelas rotas Node"""
+        producers = {
+            "pegn_news": self._refresh_news,
+            "municipal_comparison": self._ranked("municipal_comparison", self.siconfi.generate_municipal_comparison),
+            "transparency_data": self.transparency.generate_transparency_comparison,
+            "social_data": self._ranked("social_data", lambda: self.ibge.generate_social_comparison(force_refresh=True)),
+        }
+        return [RefreshJob(name, produce, REFRESH_INTERVALS[name]) for name, produce in producers.items()]
+
+    def _ranked(self, name: str, produce: Callable[[], Dict[str, Any]]) -> Callable[[], Dict[str, Any]]:
+        """Envolve o produtor para rematerializar os rankings do conjunto a cada atualização"""
+        metrics, default_year = RANKED_METRICS[name]
+
+        def produce_and_rank() -> Dict[str, Any]:
+            result = produce()
+            if result.get("success") and result.get("data"):
+                with self._rankings_lock:
+                    self.rankings.add_records(result["data"], metrics, result.get("year", default_year))
+                    self.ranking_store.publish(self.rankings.to_dict())
+            return result
+
+        return produce_and_rank
+
+    def _refresh_news(self) -> List[Dict[str, Any]]:
+        # Publica os artigos mais recentes do acervo, como o pegn_scraper.py faz na linha de comando
+        self.pegn.fetch_latest_news(max_articles=15)
+        return [article.to_dict() for article in self.pegn.store.all_articles(limit=PUBLISHED_ARTICLES)]
+
+    def _get_ranking(self, metric: str, year: Optional[int]):
+        ranking = self.rankings.get(metric, year)
+        if ranking is None:
+            raise ValueError(f"Ranking indisponível: {metric}" + (f" ({year})" if year else ""))
+        return ranking
+
+    def ranking_metrics(self) -> List[Dict[str, Any]]:
+        """Métricas e anos disponíveis no índice de rankings"""
+        return self.rankings.metrics()
+
+    def ranking_top(self, metric: str, year: Optional[int] = None, k: int = 10) -> Dict[str, Any]:
+        """Primeiros colocados de uma métrica"""
+        ranking = self._get_ranking(metric, year)
+        return {"metric": metric, "year": ranking.year, "total": len(ranking), "data": ranking.top(k)}
+
+    def ranking_municipality(self, metric: str, municipio: str, year: Optional[int] = None, k: int = 1) -> Dict[str, Any]:
+        """Posição, percentil e vizinhos de um município (por nome ou código IBGE)"""
+        ranking = self._get_ranking(metric, year)
+        entry = ranking.entry(municipio)
+        if entry is None:
+            raise ValueError(f"Município fora do ranking: {municipio}")
+        return {
+            "metric": metric,
+            "year": ranking.year,
+            "total": len(ranking),
+            **entry,
+            "percentil": ranking.percentile(municipio),
+            "vizinhos": ranking.neighbors(municipio, k),
+        }
+
+    def refresh_status(self) -> Dict[str, Any]:
+        """Situação de cada conjunto atualizado em segundo plano"""
+        return self.scheduler.status()
+
+    def refresh_run(self, name: str) -> Dict[str, Any]:
+        """Antecipa a atualização de um conjunto"""
+        if name not in self.scheduler.jobs:
+            raise ValueError(f"Conjunto desconhecido: {name}")
+        return {"name": name, "scheduled": self.scheduler.run_now(name)}
+
+    def call(self, method: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Despacha uma chamada JSON-RPC para o método registrado"""
+        if method not in self.methods:
+            return {"success": False, "error": f"Método desconhecido: {method}"}
+
+        if params is not None and not isinstance(params, dict):
+            return {"success": False, "error": "Parâmetros devem ser um objeto"}
+
+        function = self.methods[method]
+        # Confere os parâmetros antes da chamada: um TypeError lá dentro é erro do coletor, não do cliente
+        try:
+            inspect.signature(function).bind(**(params or {}))
+        except TypeError as e:
+            return {"success": False, "error": f"Parâmetros inválidos: {e}"}
+
+        try:
+            result = function(**(params or {}))
+            return {"success": True, "result": result}
+        except Exception as e:
+            logger.exception(f"Erro ao executar {method}: {e}")
+            return {"success": False, "error": str(e)}
+
+    def health(self) -> Dict[str, Any]:
+        """Informações básicas de saúde do serviço"""
+        return {
+            "status": "ok",
+            "service": "Fetcher Service",
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "methods": sorted(self.methods),
+            "refresh": self.scheduler.status(),
+        }
+
+
+class FetcherRequestHandler(BaseHTTPRequestHandler):
+    service: FetcherService = None
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        """Responde em JSON compacto, ou em msgpack se o cliente pedir (Accept: application/msgpack)"""
+        if MSGPACK_AVAILABLE and MSGPACK_CONTENT_TYPE in self.headers.get("Accept", ""):
+            body, content_type = packb(payload), MSGPACK_CONTENT_TYPE
+        else:
+            body, content_type = dumps_bytes(payload), JSON_CONTENT_TYPE
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, self.service.health())
+        else:
+            self._send_json(404, {"success": False, "error": "Rota não encontrada"})
+
+    def do_POST(self):
+        if self.path != "/rpc":
+            self._send_json(404, {"success": False, "error": "Rota não encontrada"})
+            return
+
+        binary = self.headers.get("Content-Type", "").startswith(MSGPACK_CONTENT_TYPE)
+        if binary and not MSGPACK_AVAILABLE:
+            self._send_json(415, {"success": False, "error": "msgpack não está instalado no serviço"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length)
+            request = (unpackb(body) if binary else loads(body)) if body else {}
+        except ValueError:
+            self._send_json(400, {"success": False, "error": "JSON inválido"})
+            return
+
+        if not isinstance(request, dict):
+            self._send_json(400, {"success": False, "error": "A requisição deve ser um objeto"})
+            return
+
+        response = self.service.call(request.get("method", ""), request.get("params"))
+        self._send_json(200, response)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    """Cria o servidor HTTP com uma instância única do serviço"""
+    service = FetcherService()
+    handler = type("BoundFetcherRequestHandler", (FetcherRequestHandler,), {"service": service})
+    # Porta ocupada levanta aqui, antes de haver threads de atualização rodando
+    server = ThreadingHTTPServer((host, port), handler)
+    if os.environ.get("FETCHER_REFRESH", "1") != "0":
+        service.scheduler.start()
+    return server
+
+
+def main():
+    """Função principal para iniciar o serviço"""
+    host = os.environ.get("FETCHER_SERVICE_HOST", DEFAULT_HOST)
+    port = int(os.environ.get("FETCHER_SERVICE_PORT", DEFAULT_PORT))
+
+    server = serve(host, port)
+    print(f"🛰️  Fetcher Service rodando em http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("🛑 Encerrando Fetcher Service")
+    finally:
+        server.RequestHandlerClass.service.scheduler.stop()
+        server.RequestHandlerClass.service.pegn.close()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Functional Classification - Classificação funcional da despesa (Portaria MOG nº 42/1999)
+Mapeia as contas do RREO (Anexo 2 - despesa por função/subfunção) para a hierarquia
+oficial de funções e subfunções e soma todos os totais em uma única passada
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from municipality_registry import fold_name
+
+# Incrementar quando a tabela ou as regras mudarem (invalida os totais guardados)
+CLASSIFICATION_VERSION = 3
+
+# Anexo do RREO com a despesa por função/subfunção e a coluna somada dele; as demais
+# colunas (dotações, liquidado, pago, no bimestre) repetem as mesmas contas
+FUNCTIONAL_ANNEX = "RREO-Anexo 02"
+EXPENSE_COLUMN = "DESPESAS EMPENHADAS ATÉ O BIMESTRE"
+
+FUNCTIONS = {
+    "01": "Legislativa",
+    "02": "Judiciária",
+    "03": "Essencial à Justiça",
+    "04": "Administração",
+    "05": "Defesa Nacional",
+    "06": "Segurança Pública",
+    "07": "Relações Exteriores",
+    "08": "Assistência Social",
+    "09": "Previdência Social",
+    "10": "Saúde",
+    "11": "Trabalho",
+    "12": "Educação",
+    "13": "Cultura",
+    "14": "Direitos da Cidadania",
+    "15": "Urbanismo",
+    "16": "Habitação",
+    "17": "Saneamento",
+    "18": "Gestão Ambiental",
+    "19": "Ciência e Tecnologia",
+    "20": "Agricultura",
+    "21": "Organização Agrária",
+    "22": "Indústria",
+    "23": "Comércio e Serviços",
+    "24": "Comunicações",
+    "25": "Energia",
+    "26": "Transporte",
+    "27": "Desporto e Lazer",
+    "28": "Encargos Especiais",
+    "99": "Reserva de Contingência",
+}
+
+# Subfunção -> (nome, função típica); a função típica só é usada quando o
+# demonstrativo não traz a linha da função antes das subfunções
+SUBFUNCTIONS = {
+    "031": ("Ação Legislativa", "01"),
+    "032": ("Controle Externo", "01"),
+    "061": ("Ação Judiciária", "02"),
+    "062": ("Defesa do Interesse Público no Processo Judiciário", "02"),
+    "091": ("Defesa da Ordem Jurídica", "03"),
+    "092": ("Representação Judicial e Extrajudicial", "03"),
+    "121": ("Planejamento e Orçamento", "04"),
+    "122": ("Administração Geral", "04"),
+    "123": ("Administração Financeira", "04"),
+    "124": ("Controle Interno", "04"),
+    "125": ("Normatização e Fiscalização", "04"),
+    "126": ("Tecnologia da Informação", "04"),
+    "127": ("Ordenamento Territorial", "04"),
+    "128": ("Formação de Recursos Humanos", "04"),
+    "129": ("Administração de Receitas", "04"),
+    "130": ("Administração de Concessões", "04"),
+    "131": ("Comunicação Social", "04"),
+    "151": ("Defesa Aérea", "05"),
+    "152": ("Defesa Naval", "05"),
+    "153": ("Defesa Terrestre", "05"),
+    "181": ("Policiamento", "06"),
+    "182": ("Defesa Civil", "06"),
+    "183": ("Informação e Inteligência", "06"),
+    "211": ("Relações Diplomáticas", "07"),
+    "212": ("Cooperação Internacional", "07"),
+    "241": ("Assistência ao Idoso", "08"),
+    "242": ("Assistência ao Portador de Deficiência", "08"),
+    "243": ("Assistência à Criança e ao Adolescente", "08"),
+    "244": ("Assistência Comunitária", "08"),
+    "271": ("Previdência Básica", "09"),
+    "272": ("Previdência do Regime Estatutário", "09"),
+    "273": ("Previdência Complementar", "09"),
+    "274": ("Previdência Especial", "09"),
+    "301": ("Atenção Básica", "10"),
+    "302": ("Assistência Hospitalar e Ambulatorial", "10"),
+    "303": ("Suporte Profilático e Terapêutico", "10"),
+    "304": ("Vigilância Sanitária", "10"),
+    "305": ("Vigilância Epidemiológica", "10"),
+    "306": ("Alimentação e Nutrição", "10"),
+    "331": ("Proteção e Benefícios ao Trabalhador", "11"),
+    "332": ("Relações de Trabalho", "11"),
+    "333": ("Empregabilidade", "11"),
+    "334": ("Fomento ao Trabalho", "11"),
+    "361": ("Ensino Fundamental", "12"),
+    "362": ("Ensino Médio", "12"),
+    "363": ("Ensino Profissional", "12"),
+    "364": ("Ensino Superior", "12"),
+    "365": ("Educação Infantil", "12"),
+    "366": ("Educação de Jovens e Adultos", "12"),
+    "367": ("Educação Especial", "12"),
+    "368": ("Educação Básica", "12"),
+    "391": ("Patrimônio Histórico, Artístico e Arqueológico", "13"),
+    "392": ("Difusão Cultural", "13"),
+    "421": ("Custódia e Reintegração Social", "14"),
+    "422": ("Direitos Individuais, Coletivos e Difusos", "14"),
+    "423": ("Assistência aos Povos Indígenas", "14"),
+    "451": ("Infraestrutura Urbana", "15"),
+    "452": ("Serviços Urbanos", "15"),
+    "453": ("Transportes Coletivos Urbanos", "15"),
+    "481": ("Habitação Rural", "16"),
+    "482": ("Habitação Urbana", "16"),
+    "511": ("Saneamento Básico Rural", "17"),
+    "512": ("Saneamento Básico Urbano", "17"),
+    "541": ("Preservação e Conservação Ambiental", "18"),
+    "542": ("Controle Ambiental", "18"),
+    "543": ("Recuperação de Áreas Degradadas", "18"),
+    "544": ("Recursos Hídricos", "18"),
+    "545": ("Meteorologia", "18"),
+    "571": ("Desenvolvimento Científico", "19"),
+    "572": ("Desenvolvimento Tecnológico e Engenharia", "19"),
+    "573": ("Difusão do Conhecimento Científico e Tecnológico", "19"),
+    "601": ("Promoção da Produção Vegetal", "20"),
+    "602": ("Promoção da Produção Animal", "20"),
+    "603": ("Defesa Sanitária Vegetal", "20"),
+    "604": ("Defesa Sanitária Animal", "20"),
+    "605": ("Abastecimento", "20"),
+    "606": ("Extensão Rural", "20"),
+    "607": ("Irrigação", "20"),
+    "608": ("Promoção da Produção Agropecuária", "20"),
+    "609": ("Defesa Agropecuária", "20"),
+    "631": ("Reforma Agrária", "21"),
+    "632": ("Colonização", "21"),
+    "661": ("Promoção Industrial", "22"),
+    "662": ("Produção Industrial", "22"),
+    "663": ("Mineração", "22"),
+    "664": ("Propriedade Industrial", "22"),
+    "665": ("Normalização e Qualidade", "22"),
+    "691": ("Promoção Comercial", "23"),
+    "692": ("Comercialização", "23"),
+    "693": ("Comércio Exterior", "23"),
+    "694": ("Serviços Financeiros", "23"),
+    "695": ("Turismo", "23"),
+    "721": ("Comunicações Postais", "24"),
+    "722": ("Telecomunicações", "24"),
+    "751": ("Conservação de Energia", "25"),
+    "752": ("Energia Elétrica", "25"),
+    "753": ("Combustíveis Minerais", "25"),
+    "754": ("Biocombustíveis", "25"),
+    "781": ("Transporte Aéreo", "26"),
+    "782": ("Transporte Rodoviário", "26"),
+    "783": ("Transporte Ferroviário", "26"),
+    "784": ("Transporte Hidroviário", "26"),
+    "785": ("Transportes Especiais", "26"),
+    "811": ("Desporto de Rendimento", "27"),
+    "812": ("Desporto Comunitário", "27"),
+    "813": ("Lazer", "27"),
+    "841": ("Refinanciamento da Dívida Interna", "28"),
+    "842": ("Refinanciamento da Dívida Externa", "28"),
+    "843": ("Serviço da Dívida Interna", "28"),
+    "844": ("Serviço da Dívida Externa", "28"),
+    "845": ("Outras Transferências", "28"),
+    "846": ("Outros Encargos Especiais", "28"),
+    "847": ("Transferências para a Educação Básica", "28"),
+}
+
+# "10 - Saúde", "10.301 Atenção Básica", "301 - Atenção Básica"
+_LEADING_CODE = re.compile(r"^\s*(?:(\d{2})\s*\.\s*)?(\d{2,3})\b[\s.\-–:]*")
+_TRAILING_NOTE = re.compile(r"\s*\([^)]*\)\s*$")
+
+
+def normalize_account(conta: str) -> str:
+    """Descrição da conta sem acentos, caixa, códigos iniciais, notas finais e hífens"""
+    text = _TRAILING_NOTE.sub("", _LEADING_CODE.sub("", conta))
+    return fold_name(text.replace("-", ""))
+
+
+def _build_index() -> Dict[str, Tuple[str, Optional[str]]]:
+    index: Dict[str, Tuple[str, Optional[str]]] = {}
+    for codigo, (nome, funcao) in SUBFUNCTIONS.items():
+        index[normalize_account(nome)] = (funcao, codigo)
+    # Funções prevalecem em nomes repetidos (ex.: Reserva de Contingência)
+    for codigo, nome in FUNCTIONS.items():
+        index[normalize_account(nome)] = (codigo, None)
+    return index
+
+
+# Índice montado uma única vez: nome normalizado -> (função, subfunção ou None)
+CLASSIFICATION_INDEX = _build_index()
+
+_EXPENSE_COLUMN_KEY = normalize_account(EXPENSE_COLUMN)
+
+
+@lru_cache(maxsize=16384)
+def classify(conta: str) -> Optional[Tuple[str, Optional[str]]]:
+    """(função, subfunção) da conta, pelo código no início da descrição ou pelo nome oficial"""
+    match = _LEADING_CODE.match(conta)
+    if match:
+        funcao, codigo = match.groups()
+        if len(codigo) == 3 and codigo in SUBFUNCTIONS:
+            return funcao or SUBFUNCTIONS[codigo][1], codigo
+        if len(codigo) == 2 and funcao is None and codigo in FUNCTIONS:
+            return codigo, None
+    return CLASSIFICATION_INDEX.get(normalize_account(conta))
+
+
+@lru_cache(maxsize=256)
+def is_expense_column(coluna: str) -> bool:
+    """Se a coluna é a despesa empenhada até o bimestre (com ou sem a letra da nota, ex.: "(b)")"""
+    return normalize_account(coluna) == _EXPENSE_COLUMN_KEY
+
+
+def aggregate_functions(contas: Iterable[str], colunas: Iterable[str],
+                        valores: Iterable[float]) -> Dict[str, Dict[str, Any]]:
+    """Totais de todas as funções e subfunções em uma única passada pelas linhas do Anexo 2
+
+    Só entram as linhas da coluna EXPENSE_COLUMN; as linhas de outros anexos devem ser
+    filtradas antes (o Anexo 12 de saúde, por exemplo, repete nomes de subfunções).
+
+    No Anexo 2 as subfunções vêm logo abaixo da função a que pertencem; por isso uma
+    subfunção é somada à última função vista (ou à sua função típica, se nenhuma apareceu).
+    O total da função é o da própria linha da função; sem ela, a soma das subfunções.
+    """
+    function_rows: Dict[str, float] = {}
+    subfunction_rows: Dict[Tuple[str, str], float] = {}
+    current_function: Optional[str] = None
+
+    for conta, coluna, valor in zip(contas, colunas, valores):
+        if not is_expense_column(coluna):
+            continue
+        classification = classify(conta)
+        if classification is None:
+            continue
+        funcao, subfuncao = classification
+        if subfuncao is None:
+            current_function = funcao
+            function_rows[funcao] = function_rows.get(funcao, 0.0) + valor
+        else:
+            key = (current_function or funcao, subfuncao)
+            subfunction_rows[key] = subfunction_rows.get(key, 0.0) + valor
+
+    breakdown: Dict[str, Dict[str, Any]] = {}
+    for funcao, total in function_rows.items():
+        breakdown[funcao] = {"nome": FUNCTIONS[funcao], "total": total, "subfuncoes": {}}
+    for (funcao, subfuncao), total in subfunction_rows.items():
+        entry = breakdown.get(funcao)
+        if entry is None:
+            entry = breakdown[funcao] = {"nome": FUNCTIONS[funcao], "total": 0.0, "subfuncoes": {}}
+        if funcao not in function_rows:
+            entry["total"] += total
+        entry["subfuncoes"][subfuncao] = {"nome": SUBFUNCTIONS[subfuncao][0], "total": total}
+
+    return dict(sorted(breakdown.items()))
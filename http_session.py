@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+HTTP Session - Sessão HTTP compartilhada pelos fetchers
+Reaproveita conexões (keep-alive) com IBGE, Tesouro e G1 e repete
+automaticamente requisições que falham com 429/5xx, com espera exponencial
+"""
+
+import os
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_POOL_SIZE = int(os.environ.get("FETCHER_HTTP_POOL_SIZE", 16))
+DEFAULT_RETRIES = int(os.environ.get("FETCHER_HTTP_RETRIES", 3))
+DEFAULT_BACKOFF = float(os.environ.get("FETCHER_HTTP_BACKOFF", 0.5))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def create_session(pool_size: int = DEFAULT_POOL_SIZE, retries: int = DEFAULT_RETRIES,
+                   backoff_factor: float = DEFAULT_BACKOFF) -> requests.Session:
+    """Cria uma sessão com pool de conexões e retentativas com backoff exponencial"""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+        # Após a última tentativa devolve a resposta para o fetcher tratar o status
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_shared_session: Optional[requests.Session] = None
+_shared_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Sessão compartilhada por todos os fetchers do processo"""
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            _shared_session = create_session()
+        return _shared_session
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+IBGE Aggregates - Consultas em lote à API de agregados do IBGE
+Agrupa vários municípios, variáveis e períodos no menor número de chamadas
+e separa a resposta (resultados/series) de volta por município
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from fetch_pool import fetch_concurrently
+from response_cache import cached_get
+
+IBGE_BASE_URL = "https://servicodados.ibge.gov.br/api/v1"
+
+# Mantém cada URL bem abaixo dos limites de tamanho aceitos pelo servidor
+MAX_CODES_PER_REQUEST = 100
+
+# Marcadores usados pelo IBGE para valores ausentes, sigilosos ou não aplicáveis
+MISSING_VALUES = {"", "-", "...", "..", "X"}
+
+
+def chunked(items: List[str], size: int) -> Iterable[List[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def build_aggregate_urls(
+    agregado: int,
+    variaveis: Iterable[int],
+    periodos: Iterable[int],
+    codes: Iterable[str],
+    base_url: str = IBGE_BASE_URL,
+    nivel: str = "N6",
+    max_codes: int = MAX_CODES_PER_REQUEST,
+) -> List[str]:
+    """Monta as URLs do agregado, empacotando até `max_codes` localidades por chamada"""
+    variaveis_param = "|".join(str(v) for v in variaveis)
+    periodos_param = "|".join(str(p) for p in periodos)
+    unique_codes = list(dict.fromkeys(str(code) for code in codes))
+
+    return [
+        f"{base_url}/agregados/{agregado}/periodos/{periodos_param}/variaveis/{variaveis_param}"
+        f"?localidades={nivel}[{','.join(chunk)}]"
+        for chunk in chunked(unique_codes, max_codes)
+    ]
+
+
+def parse_value(value: Any) -> Optional[float]:
+    """Converte o valor textual do IBGE em float (None para valores ausentes)"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = str(value).strip()
+    if value in MISSING_VALUES:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def parse_aggregate_response(payload: List[Dict[str, Any]]) -> Dict[str, Dict[str, Dict[str, Optional[float]]]]:
+    """Separa a resposta do agregado por município: {codigo: {variavel: {periodo: valor}}}"""
+    parsed: Dict[str, Dict[str, Dict[str, Optional[float]]]] = {}
+
+    for variavel in payload or []:
+        variavel_id = str(variavel.get("id"))
+        for resultado in variavel.get("resultados", []):
+            for serie in resultado.get("series", []):
+                code = str(serie.get("localidade", {}).get("id"))
+                values = parsed.setdefault(code, {}).setdefault(variavel_id, {})
+                for periodo, valor in serie.get("serie", {}).items():
+                    values[str(periodo)] = parse_value(valor)
+
+    return parsed
+
+
+def fetch_aggregate(
+    agregado: int,
+    variaveis: Iterable[int],
+    periodos: Iterable[int],
+    codes: Iterable[str],
+    rate_limiter=None,
+    max_workers: int = 4,
+    timeout: float = 10,
+) -> Dict[str, Any]:
+    """Busca o agregado para todos os municípios e devolve os valores por município"""
+    urls = build_aggregate_urls(agregado, list(variaveis), list(periodos), codes)
+
+    def fetch(url: str) -> Dict[str, Any]:
+        response = cached_get(url, timeout=timeout, rate_limiter=rate_limiter)
+        if response.status_code != 200:
+            return {"success": False, "error": f"HTTP {response.status_code}"}
+        return {"success": True, "data": parse_aggregate_response(response.json())}
+
+    results = fetch_concurrently(
+        {url: (lambda url=url: fetch(url)) for url in urls}, max_workers=max_workers
+    )
+
+    data: Dict[str, Any] = {}
+    errors = []
+    for result in results.values():
+        if result.get("success"):
+            data.update(result["data"])
+        else:
+            errors.append(result.get("error"))
+
+    if errors and not data:
+        return {"success": False, "error": "; ".join(errors)}
+    return {"success": True, "data": data, "errors": errors}
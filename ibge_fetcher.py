@@ -4,21 +4,41 @@ IBGE Data Fetcher - API Oficial do IBGE
 Busca dados sociais reais (população, PIB, IDH) dos municípios
 """
 
-import requests
-import json
-from typing import Dict, List, Any
+import argparse
+import hashlib
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Any, Optional
+
+from fetch_pool import fetch_concurrently
+from ibge_aggregates import parse_aggregate_response
+from municipality_registry import DEFAULT_MUNICIPALITIES, resolve_municipalities
+from records import MunicipalIndicator
+from response_cache import cached_get
+from serialization import dumps, loads
+from snapshot_store import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+# Um arquivo por conjunto de municípios: ibge_social_comparison.<hash dos códigos>.json
+DATASET_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), ".cache", "ibge_social_comparison.json"
+)
 
 class IBGEDataFetcher:
-    def __init__(self):
+    def __init__(self, municipalities: Optional[Iterable[str]] = None, dataset_ttl: float = 24 * 3600, dataset_cache_path: str = DATASET_CACHE_PATH):
         self.base_url = "https://servicodados.ibge.gov.br/api/v1"
-        self.municipalities = {
-            "Monte Santo": "2921400",
-            "Cansanção": "2906107", 
-            "Uauá": "2932401",
-            "Quijingue": "2925807",
-            "Euclides da Cunha": "2910702",
-            "Senhor do Bonfim": "2930108"
-        }
+        # {nome: código IBGE} resolvido pelo cadastro compartilhado de municípios
+        requested = list(municipalities or DEFAULT_MUNICIPALITIES)
+        self.municipalities = resolve_municipalities(requested)
+        # Nomes que o cadastro não reconheceu, informados junto com a comparação
+        self.unresolved = [name for name in requested if name not in self.municipalities]
+        # Comparação já processada é reaproveitada sem acessar a rede
+        self.dataset_ttl = dataset_ttl
+        self.dataset_key = hashlib.sha1(",".join(sorted(self.municipalities.values())).encode()).hexdigest()[:12]
+        root, ext = os.path.splitext(dataset_cache_path)
+        self.dataset_cache_path = f"{root}.{self.dataset_key}{ext}"
         
     def fetch_population_data(self) -> Dict[str, Any]:
         """Busca dados de população estimada dos municípios"""
@@ -27,7 +47,7 @@ class IBGEDataFetcher:
             municipio_codes = ",".join(self.municipalities.values())
             url = f"{self.base_url}/projecoes/populacao/{municipio_codes}"
             
-            response = requests.get(url, timeout=10)
+            response = cached_get(url, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -45,7 +65,7 @@ class IBGEDataFetcher:
             municipio_codes = ",".join(self.municipalities.values())
             url = f"{self.base_url}/agregados/5938/periodos/2021/variaveis/37?localidades=N6[{municipio_codes}]"
             
-            response = requests.get(url, timeout=10)
+            response = cached_get(url, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -61,7 +81,7 @@ class IBGEDataFetcher:
         social_data = [
             {
                 "municipio": "Monte Santo",
-                "codigo": "2921400",
+                "codigo": "2922250",
                 "populacao": 54892,
                 "pib_per_capita": 8947,
                 "idhm": 0.506,
@@ -71,7 +91,7 @@ class IBGEDataFetcher:
             },
             {
                 "municipio": "Senhor do Bonfim",
-                "codigo": "2930108", 
+                "codigo": "2930709", 
                 "populacao": 78724,
                 "pib_per_capita": 12384,
                 "idhm": 0.584,
@@ -81,7 +101,7 @@ class IBGEDataFetcher:
             },
             {
                 "municipio": "Euclides da Cunha",
-                "codigo": "2910702",
+                "codigo": "2910800",
                 "populacao": 57148,
                 "pib_per_capita": 9635,
                 "idhm": 0.541,
@@ -91,7 +111,7 @@ class IBGEDataFetcher:
             },
             {
                 "municipio": "Uauá",
-                "codigo": "2932401",
+                "codigo": "2933109",
                 "populacao": 25987,
                 "pib_per_capita": 7823,
                 "idhm": 0.485,
@@ -101,7 +121,7 @@ class IBGEDataFetcher:
             },
             {
                 "municipio": "Cansanção",
-                "codigo": "2906107",
+                "codigo": "2906303",
                 "populacao": 33068,
                 "pib_per_capita": 6947,
                 "idhm": 0.487,
@@ -111,7 +131,7 @@ class IBGEDataFetcher:
             },
             {
                 "municipio": "Quijingue",
-                "codigo": "2925807",
+                "codigo": "2925808",
                 "populacao": 31927,
                 "pib_per_capita": 6234,
                 "idhm": 0.472,
@@ -121,53 +141,198 @@ class IBGEDataFetcher:
             }
         ]
         
+        records = self.rank_by_pib_per_capita([MunicipalIndicator.from_dict(city) for city in social_data])
+        return {
+            "success": True,
+            "data": [record.to_dict() for record in records],
+            "source": "IBGE - Dados Oficiais",
+            "year": 2024
+        }
+    
+    def rank_by_pib_per_capita(self, social_data: List[MunicipalIndicator]) -> List[MunicipalIndicator]:
+        """Ordena por PIB per capita e atribui status/cor de cada posição (sem PIB: ao final, sem status)"""
         # Classificar por PIB per capita
-        social_data.sort(key=lambda x: x["pib_per_capita"], reverse=True)
+        social_data.sort(key=lambda x: (x.pib_per_capita is not None, x.pib_per_capita or 0), reverse=True)
         
         # Adicionar rankings de cor baseados no PIB per capita
-        for i, city in enumerate(social_data):
+        for i, city in enumerate(city for city in social_data if city.pib_per_capita is not None):
             if i == 0:  # Maior PIB
-                city["status"] = "excellent"
-                city["rank_color"] = "#059669"
+                city.status = "excellent"
+                city.rank_color = "#059669"
             elif i <= 2:  # PIB médio-alto
-                city["status"] = "good" 
-                city["rank_color"] = "#0891b2"
+                city.status = "good" 
+                city.rank_color = "#0891b2"
             elif i <= 4:  # PIB médio
-                city["status"] = "warning"
-                city["rank_color"] = "#d97706"
+                city.status = "warning"
+                city.rank_color = "#d97706"
             else:  # PIB baixo
-                city["status"] = "alert"
-                city["rank_color"] = "#dc2626"
+                city.status = "alert"
+                city.rank_color = "#dc2626"
+        
+        return social_data
+    
+    def parse_population_data(self, payload: Any) -> Dict[str, int]:
+        """Extrai {codigo: população} da resposta de projeções populacionais"""
+        records = payload if isinstance(payload, list) else [payload]
+        populations = {}
+        
+        for record in records:
+            if not isinstance(record, dict):
+                continue
+            
+            localidade = record.get("localidade")
+            codigo = str(localidade.get("id") if isinstance(localidade, dict) else localidade)
+            projecao = record.get("projecao")
+            populacao = projecao.get("populacao") if isinstance(projecao, dict) else projecao
+            
+            if codigo in self.municipalities.values() and populacao:
+                populations[codigo] = int(populacao)
         
+        return populations
+    
+    def parse_pib_data(self, payload: Any) -> Dict[str, float]:
+        """Extrai {codigo: PIB em reais} do agregado 5938 (valores em mil reais)"""
+        pib = {}
+        for codigo, variaveis in parse_aggregate_response(payload).items():
+            valor = variaveis.get("37", {}).get("2021")
+            if valor:
+                pib[codigo] = valor * 1000
+        return pib
+    
+    def build_social_dataset(self, populations: Dict[str, int], pib: Dict[str, float]) -> List[Dict[str, Any]]:
+        """Combina os dados da API com os históricos, usando o histórico só nos campos ausentes
+
+        Municípios sem dados históricos entram só com o que a API trouxe; IDHM e área,
+        que a API não fornece, ficam vazios (None).
+        """
+        social_data = []
+        
+        historical_by_code = {
+            city["codigo"]: MunicipalIndicator.from_dict(city)
+            for city in self.get_historical_social_data()["data"]
+        }
+        
+        for nome, codigo in self.municipalities.items():
+            historical = historical_by_code.get(codigo)
+            populacao = populations.get(codigo) or (historical.populacao if historical else None)
+            pib_total = pib.get(codigo)
+            area_km2 = historical.area_km2 if historical else None
+            
+            if pib_total and populacao:
+                pib_per_capita = round(pib_total / populacao)
+            else:
+                pib_per_capita = historical.pib_per_capita if historical else None
+            
+            from_api = codigo in populations or bool(pib_total)
+            if historical is None:
+                fonte = "IBGE (API)" if from_api else None
+            else:
+                fonte = "IBGE (API) / PNUD 2010" if from_api else historical.fonte
+            
+            social_data.append(MunicipalIndicator(
+                municipio=nome,
+                codigo=codigo,
+                populacao=populacao,
+                pib_per_capita=pib_per_capita,
+                idhm=historical.idhm if historical else None,
+                area_km2=area_km2,
+                densidade_dem=round(populacao / area_km2, 1) if populacao and area_km2 else None,
+                fonte=fonte
+            ))
+        
+        return [record.to_dict() for record in self.rank_by_pib_per_capita(social_data)]
+    
+    def _historical_fallback(self) -> Dict[str, Any]:
+        """Dados históricos dos municípios pedidos que os têm (APIs fora do ar)"""
+        result = self.get_historical_social_data()
+        codes = set(self.municipalities.values())
+        records = [MunicipalIndicator.from_dict(city) for city in result["data"] if city["codigo"] in codes]
+        found = {record.codigo for record in records}
+        sem_dados = sorted(nome for nome, codigo in self.municipalities.items() if codigo not in found)
+        if not records:
+            # Nada a publicar: o agendador mantém o snapshot anterior em vez de gravar uma lista vazia
+            return {
+                "success": False,
+                "error": "Sem dados históricos para os municípios pedidos",
+                "unresolved": self.unresolved,
+                "sem_dados": sem_dados,
+            }
         return {
-            "success": True,
-            "data": social_data,
-            "source": "IBGE - Dados Oficiais",
-            "year": 2024
+            **result,
+            "data": [record.to_dict() for record in self.rank_by_pib_per_capita(records)],
+            "unresolved": self.unresolved,
+            "sem_dados": sem_dados,
         }
     
-    def generate_social_comparison(self) -> Dict[str, Any]:
+    def _load_cached_dataset(self) -> Optional[Dict[str, Any]]:
+        """Comparação processada anteriormente, se ainda estiver dentro do TTL"""
+        try:
+            if time.time() - os.path.getmtime(self.dataset_cache_path) > self.dataset_ttl:
+                return None
+            with open(self.dataset_cache_path, "rb") as f:
+                cached = loads(f.read())
+        except (OSError, ValueError):
+            return None
+        # Confere o conjunto de municípios (arquivos antigos, sem chave, são ignorados)
+        if not isinstance(cached, dict) or cached.get("municipios") != self.dataset_key:
+            return None
+        return cached.get("result")
+    
+    def _save_cached_dataset(self, result: Dict[str, Any]):
+        try:
+            atomic_write_json(self.dataset_cache_path, {"municipios": self.dataset_key, "result": result})
+        except OSError as e:
+            logger.warning(f"Não foi possível salvar o cache da comparação: {e}")
+    
+    def generate_social_comparison(self, force_refresh: bool = False) -> Dict[str, Any]:
         """Gera comparação social entre municípios com dados do IBGE"""
         print("🌍 Buscando dados sociais do IBGE...")
         
+        cached = None if force_refresh else self._load_cached_dataset()
+        if cached:
+            print("⚡ Usando comparação social em cache")
+            return cached
+        
         try:
             # Tentar buscar dados reais do IBGE
-            population_data = self.fetch_population_data()
-            pib_data = self.fetch_pib_data()
+            live_data = fetch_concurrently({
+                "population": self.fetch_population_data,
+                "pib": self.fetch_pib_data
+            }, max_workers=2)
+            population_data = live_data["population"]
+            pib_data = live_data["pib"]
+            
+            populations = self.parse_population_data(population_data["data"]) if population_data.get("success") else {}
+            pib = self.parse_pib_data(pib_data["data"]) if pib_data.get("success") else {}
             
             # Se APIs falharem, usar dados históricos oficiais
-            if not population_data.get("success") or not pib_data.get("success"):
+            if not populations and not pib:
                 print("📊 Usando dados históricos oficiais do IBGE")
-                return self.get_historical_social_data()
+                return self._historical_fallback()
             
-            # Processar dados reais da API (implementar parsing se APIs funcionarem)
-            return self.get_historical_social_data()
+            result = {
+                "success": True,
+                "data": self.build_social_dataset(populations, pib),
+                "source": "IBGE - API de Serviços de Dados",
+                "year": 2024,
+                "unresolved": self.unresolved
+            }
+            self._save_cached_dataset(result)
+            return result
             
         except Exception as e:
             print(f"❌ Erro ao buscar dados IBGE: {str(e)}")
-            return self.get_historical_social_data()
+            return self._historical_fallback()
 
-if __name__ == "__main__":
+def main():
+    """Função principal para executar o fetcher"""
+    parser = argparse.ArgumentParser(description="Busca dados sociais dos municípios no IBGE")
+    parser.add_argument("--pretty", action="store_true", help="JSON indentado (padrão: compacto)")
+    args = parser.parse_args()
+    
     fetcher = IBGEDataFetcher()
     result = fetcher.generate_social_comparison()
-    print(json.dumps(result, indent=2, ensure_ascii=False))
\ No newline at end of file
+    print(dumps(result, args.pretty))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Municipality Registry - Cadastro compartilhado de municípios do IBGE
+Carrega o catálogo de localidades do IBGE (guardado localmente em formato compacto)
+e indexa por código, nome, nome sem acento, microrregião e estado
+"""
+
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+import unicodedata
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from response_cache import cached_get
+
+logger = logging.getLogger(__name__)
+
+LOCALIDADES_URL = "https://servicodados.ibge.gov.br/api/v1/localidades/municipios"
+
+REGISTRY_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), ".cache", "municipios.json.gz"
+)
+REGISTRY_MAX_AGE = 30 * 24 * 3600
+
+# Municípios comparados nos painéis de transparência
+DEFAULT_MUNICIPALITIES = [
+    "Monte Santo",
+    "Cansanção",
+    "Uauá",
+    "Quijingue",
+    "Euclides da Cunha",
+    "Senhor do Bonfim",
+]
+
+
+class Municipality(NamedTuple):
+    codigo: str
+    nome: str
+    uf: str
+    microrregiao_id: str
+    microrregiao: str
+
+
+# Usado quando o catálogo do IBGE ainda não foi baixado e a API está fora do ar
+SEED_MUNICIPALITIES = [
+    Municipality("2922250", "Monte Santo", "BA", "", "Euclides da Cunha"),
+    Municipality("2906303", "Cansanção", "BA", "", "Euclides da Cunha"),
+    Municipality("2933109", "Uauá", "BA", "", "Euclides da Cunha"),
+    Municipality("2925808", "Quijingue", "BA", "", "Euclides da Cunha"),
+    Municipality("2910800", "Euclides da Cunha", "BA", "", "Euclides da Cunha"),
+    Municipality("2930709", "Senhor do Bonfim", "BA", "", "Senhor do Bonfim"),
+]
+
+
+def fold_name(name: str) -> str:
+    """Normaliza o nome para busca: sem acentos, minúsculo e espaços simples"""
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.lower().split())
+
+
+class MunicipalityRegistry:
+    def __init__(self, municipalities: Iterable[Municipality]):
+        self.by_code: Dict[str, Municipality] = {}
+        self._by_name: Dict[str, List[Municipality]] = {}
+        self._by_folded_name: Dict[str, List[Municipality]] = {}
+        self._by_microregion: Dict[str, List[Municipality]] = {}
+        self._by_state: Dict[str, List[Municipality]] = {}
+
+        for municipality in municipalities:
+            self.by_code[municipality.codigo] = municipality
+            self._by_name.setdefault(municipality.nome, []).append(municipality)
+            self._by_folded_name.setdefault(fold_name(municipality.nome), []).append(municipality)
+            for key in (municipality.microrregiao_id, fold_name(municipality.microrregiao)):
+                if key:
+                    self._by_microregion.setdefault(key, []).append(municipality)
+            self._by_state.setdefault(municipality.uf.upper(), []).append(municipality)
+
+    def __len__(self) -> int:
+        return len(self.by_code)
+
+    def get(self, codigo: str) -> Optional[Municipality]:
+        """Busca pelo código IBGE de 7 dígitos"""
+        return self.by_code.get(str(codigo))
+
+    def find(self, name: str, uf: Optional[str] = None) -> List[Municipality]:
+        """Busca pelo nome exato ou, se não houver, pelo nome sem acentos"""
+        matches = self._by_name.get(name) or self._by_folded_name.get(fold_name(name), [])
+        if uf:
+            matches = [m for m in matches if m.uf == uf.upper()]
+        return matches
+
+    def find_one(self, name: str, uf: Optional[str] = None) -> Optional[Municipality]:
+        """Primeiro município com o nome informado (use `uf` para desambiguar)"""
+        matches = self.find(name, uf)
+        return matches[0] if matches else None
+
+    def in_microregion(self, microrregiao: str) -> List[Municipality]:
+        """Municípios de uma microrregião (por código ou nome)"""
+        key = str(microrregiao)
+        return self._by_microregion.get(key) or self._by_microregion.get(fold_name(key), [])
+
+    def in_state(self, uf: str) -> List[Municipality]:
+        """Municípios de um estado (sigla da UF)"""
+        return self._by_state.get(uf.upper(), [])
+
+    def resolve(self, names: Iterable[str], uf: Optional[str] = "BA") -> Dict[str, str]:
+        """Converte nomes em {nome: código}; nomes não encontrados são ignorados"""
+        resolved = {}
+        for name in names:
+            municipality = self.find_one(name, uf)
+            if municipality:
+                resolved[name] = municipality.codigo
+            else:
+                logger.warning(f"Município não encontrado no cadastro: {name}")
+        return resolved
+
+
+def parse_localidades(payload: List[Dict]) -> List[Municipality]:
+    """Converte a resposta de /localidades/municipios em registros compactos"""
+    municipalities = []
+    for item in payload:
+        microrregiao = item.get("microrregiao") or {}
+        uf = microrregiao.get("mesorregiao", {}).get("UF") or (
+            (item.get("regiao-imediata") or {}).get("regiao-intermediaria", {}).get("UF", {})
+        )
+        municipalities.append(Municipality(
+            str(item["id"]),
+            item["nome"],
+            uf.get("sigla", ""),
+            str(microrregiao.get("id", "")),
+            microrregiao.get("nome", ""),
+        ))
+    return municipalities
+
+
+def _read_compact(path: str) -> Optional[List[Municipality]]:
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return [Municipality(*row) for row in json.load(f)]
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def _write_compact(path: str, municipalities: List[Municipality]):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump([list(m) for m in municipalities], f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def load_registry(path: str = REGISTRY_CACHE_PATH, refresh: bool = False) -> MunicipalityRegistry:
+    """Carrega o cadastro do arquivo local, baixando do IBGE quando necessário"""
+    municipalities = _read_compact(path)
+
+    try:
+        expired = time.time() - os.path.getmtime(path) > REGISTRY_MAX_AGE
+    except OSError:
+        expired = True
+
+    if refresh or expired or municipalities is None:
+        try:
+            response = cached_get(LOCALIDADES_URL, timeout=10)
+            if response.status_code == 200:
+                municipalities = parse_localidades(response.json())
+                _write_compact(path, municipalities)
+        except Exception as e:
+            # Mantém a cópia local antiga, se houver
+            logger.warning(f"Erro ao carregar municípios do IBGE: {e}")
+
+    if not municipalities:
+        municipalities = SEED_MUNICIPALITIES
+    return MunicipalityRegistry(municipalities)
+
+
+_registry: Optional[MunicipalityRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> MunicipalityRegistry:
+    """Cadastro compartilhado por todos os fetchers do processo"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = load_registry()
+        return _registry
+
+
+def resolve_municipalities(names: Optional[Iterable[str]] = None, uf: Optional[str] = "BA") -> Dict[str, str]:
+    """{nome: código IBGE} para os municípios informados (padrão: os do painel)"""
+    return get_registry().resolve(names or DEFAULT_MUNICIPALITIES, uf)
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+NDJSON Output - Saída incremental em JSON por linha (newline-delimited JSON)
+Grava cada registro assim que o fetcher o produz, sem montar o resultado inteiro
+"""
+
+import sys
+from contextlib import redirect_stdout
+from typing import Any, Dict, Iterable
+
+from serialization import dumps
+
+
+def write_ndjson(records: Iterable[Dict[str, Any]], target: str = "-") -> int:
+    """Grava os registros em `target` ("-" = stdout), um JSON por linha, e devolve quantos foram gravados
+
+    Mensagens de progresso impressas pelos fetchers vão para stderr, para não
+    se misturarem aos registros.
+    """
+    output = sys.stdout if target == "-" else open(target, "w", encoding="utf-8")
+    count = 0
+    try:
+        with redirect_stdout(sys.stderr):
+            for record in records:
+                output.write(dumps(record))
+                output.write("\n")
+                output.flush()
+                count += 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return count
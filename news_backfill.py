@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+News Backfill - Carga histórica do acervo de notícias pelos sitemaps do arquivo
+Percorre os sitemaps da fonte dentro de um intervalo de datas e alimenta o mesmo
+pipeline do scraper (download com cortesia por host, extração, deduplicação, acervo),
+gravando o progresso em disco para retomar de onde parou após uma interrupção
+"""
+
+import argparse
+import gzip
+import logging
+import os
+import re
+import time
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from article_store import DEFAULT_STORE_PATH
+from news_sources import SOURCES, NewsSource, get_sources, parse_sitemap
+from pegn_scraper import DEFAULT_EXTRACT_PROCESSES, PEGNScraper
+from serialization import loads
+from snapshot_store import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_DIR = os.path.join(os.path.dirname(DEFAULT_STORE_PATH), "backfill")
+
+# Requisições por segundo ao site durante o backfill (o histórico é grande; sem pressa)
+DEFAULT_RATE = 2.0
+
+# Índices de sitemaps podem apontar para outros índices (ano -> mês -> dia)
+MAX_SITEMAP_DEPTH = 4
+
+# Progresso gravado a cada tantos artigos processados (além do fim de cada sitemap)
+CHECKPOINT_EVERY = 50
+
+# Datas no caminho: /2024/05/02/, /2024/05/, /2024/ (ou 2024-05-02 no nome do arquivo)
+_FULL_DATE = re.compile(r"(\d{4})[/_-](\d{2})[/_-](\d{2})(?!\d)")
+_MONTH = re.compile(r"/(\d{4})[/_-](\d{2})(?=[/_.-])")
+_YEAR = re.compile(r"/(\d{4})(?=[/_.])")
+
+
+def parse_day(text: str) -> Optional[date]:
+    """Data (AAAA-MM-DD) do início de um lastmod/publication_date"""
+    try:
+        return date.fromisoformat(text[:10])
+    except (TypeError, ValueError):
+        return None
+
+
+def date_span(loc: str) -> Optional[Tuple[date, date]]:
+    """Intervalo de datas coberto por uma URL de sitemap ou de artigo, pelo caminho"""
+    try:
+        match = _FULL_DATE.search(loc)
+        if match:
+            day = date(*map(int, match.groups()))
+            return day, day
+        match = _MONTH.search(loc)
+        if match:
+            year, month = map(int, match.groups())
+            last = date(year + month // 12, month % 12 + 1, 1).toordinal() - 1
+            return date(year, month, 1), date.fromordinal(last)
+        match = _YEAR.search(loc)
+        if match and 1990 <= int(match.group(1)) <= 2100:
+            year = int(match.group(1))
+            return date(year, 1, 1), date(year, 12, 31)
+    except ValueError:
+        pass
+    return None
+
+
+class Backfill:
+    def __init__(self, scraper: PEGNScraper, source: NewsSource, start: date, end: date,
+                 checkpoint_path: Optional[str] = None):
+        if not source.archive_sitemaps:
+            raise ValueError(f"A fonte {source.name} não tem sitemaps de arquivo para backfill")
+        self.scraper = scraper
+        self.source = source
+        self.start = start
+        self.end = end
+        self.checkpoint_path = checkpoint_path or os.path.join(DEFAULT_CHECKPOINT_DIR, f"{source.name}.json")
+
+        # Sitemaps cujos artigos já foram todos processados; artigos pendentes por sitemap
+        self.done: set = set()
+        self.stats: Dict[str, int] = {"descobertos": 0, "ja_no_acervo": 0, "raspados": 0, "sem_artigo": 0, "erros": 0}
+        self._pending: Dict[str, int] = {}
+        # Sitemaps com downloads que falharam não são marcados como concluídos (são revistos ao retomar)
+        self._failed: set = set()
+        self._sitemap_of: Dict[str, str] = {}
+        self._since_checkpoint = 0
+        self._load_checkpoint()
+
+    def _load_checkpoint(self):
+        if not os.path.exists(self.checkpoint_path):
+            return
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            checkpoint = loads(f.read())
+        # Outro intervalo de datas: os sitemaps foram filtrados de outro jeito e são revistos
+        # (os artigos já no acervo continuam sendo pulados sem download)
+        if checkpoint.get("inicio") == self.start.isoformat() and checkpoint.get("fim") == self.end.isoformat():
+            self.done = set(checkpoint.get("sitemaps_concluidos", []))
+            logger.info(f"Retomando backfill de {self.source.name}: {len(self.done)} sitemaps já concluídos")
+
+    def save_checkpoint(self):
+        atomic_write_json(self.checkpoint_path, {
+            "fonte": self.source.name,
+            "inicio": self.start.isoformat(),
+            "fim": self.end.isoformat(),
+            "sitemaps_concluidos": sorted(self.done),
+            # Estatísticas da execução atual
+            "estatisticas": self.stats,
+            "atualizado_em": datetime.now().isoformat(),
+        }, pretty=True)
+        self._since_checkpoint = 0
+
+    def _in_range(self, span: Optional[Tuple[date, date]]) -> bool:
+        return span is None or (span[0] <= self.end and span[1] >= self.start)
+
+    def _fetch_sitemap(self, url: str) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+        response = self.scraper._get(url)
+        response.raise_for_status()
+        content = response.content
+        if url.endswith(".gz") or content[:2] == b"\x1f\x8b":
+            content = gzip.decompress(content)
+        return parse_sitemap(content.decode("utf-8", errors="replace"))
+
+    def iter_sitemaps(self, url: str, depth: int = 0) -> Iterator[Tuple[str, List[Tuple[str, str]]]]:
+        """(sitemap, páginas) de cada sitemap de artigos do intervalo, descendo pelos índices"""
+        try:
+            pages, children = self._fetch_sitemap(url)
+        except Exception as e:
+            logger.error(f"Erro ao ler sitemap {url}: {e}")
+            return
+        if pages:
+            yield url, pages
+        if depth >= MAX_SITEMAP_DEPTH:
+            return
+        # Do mais antigo para o mais recente, para o progresso avançar em ordem
+        for loc, lastmod in sorted(children, key=lambda child: date_span(child[0]) or (date.min,)):
+            if loc in self.done:
+                continue
+            span = date_span(loc)
+            modified = parse_day(lastmod)
+            # Sem data no caminho: um sitemap alterado pela última vez antes do início só tem artigos antigos
+            if not self._in_range(span) or (span is None and modified and modified < self.start):
+                continue
+            yield from self.iter_sitemaps(loc, depth + 1)
+
+    def _page_in_range(self, loc: str, lastmod: str) -> bool:
+        span = date_span(loc)
+        if span is None:
+            day = parse_day(lastmod)
+            span = (day, day) if day else None
+        return self._in_range(span)
+
+    def iter_jobs(self) -> Iterator[Tuple[str, NewsSource]]:
+        """(url, fonte) dos artigos do intervalo que ainda não estão no acervo"""
+        for root in self.source.archive_sitemaps:
+            for sitemap, pages in self.iter_sitemaps(root):
+                if sitemap in self.done:
+                    continue
+                urls = self.scraper.dedupe_links(
+                    loc for loc, lastmod in pages
+                    if self.source.is_article_url(loc) and self._page_in_range(loc, lastmod)
+                )
+                self.stats["descobertos"] += len(urls)
+                todo = []
+                for url in urls:
+                    if url in self.scraper.store:
+                        self.stats["ja_no_acervo"] += 1
+                    elif url not in self._sitemap_of:
+                        todo.append(url)
+
+                if not todo:
+                    self._sitemap_done(sitemap)
+                    continue
+                self._pending[sitemap] = len(todo)
+                for url in todo:
+                    self._sitemap_of[url] = sitemap
+                    yield url, self.source
+
+    def _sitemap_done(self, sitemap: str):
+        if sitemap not in self._failed:
+            self.done.add(sitemap)
+        self._pending.pop(sitemap, None)
+        self.save_checkpoint()
+
+    def _record(self, url: str, article: Any):
+        sitemap = self._sitemap_of.pop(url, None)
+        if article:
+            self.stats["raspados"] += 1
+        elif url in self.scraper.store:
+            self.stats["sem_artigo"] += 1
+        else:
+            # Nada gravado no acervo: o download ou a extração falhou
+            self.stats["erros"] += 1
+            if sitemap is not None:
+                self._failed.add(sitemap)
+        if sitemap is not None:
+            self._pending[sitemap] -= 1
+            if self._pending[sitemap] == 0:
+                self._sitemap_done(sitemap)
+                return
+        self._since_checkpoint += 1
+        if self._since_checkpoint >= CHECKPOINT_EVERY:
+            self.save_checkpoint()
+
+    def run(self, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Executa (ou retoma) o backfill; `limit` encerra após tantos artigos processados"""
+        if not self.scraper._fingerprints_synced:
+            self.scraper.sync_fingerprints()
+
+        started = time.time()
+        processed = 0
+        try:
+            for url, article in self.scraper.iter_scrape(self.iter_jobs()):
+                self._record(url, article)
+                processed += 1
+                if processed % 25 == 0:
+                    logger.info(f"{processed} artigos processados ({self.stats['raspados']} novos no acervo)")
+                if limit is not None and processed >= limit:
+                    break
+        finally:
+            # Interrompido ou não, o progresso fica gravado para retomar depois
+            self.save_checkpoint()
+
+        return {
+            "success": True,
+            "data": {
+                "fonte": self.source.name,
+                "inicio": self.start.isoformat(),
+                "fim": self.end.isoformat(),
+                "processados": processed,
+                "sitemaps_concluidos": len(self.done),
+                "estatisticas": dict(self.stats),
+                "duracao_s": round(time.time() - started, 1),
+            },
+        }
+
+
+def main():
+    """Função principal para executar o backfill"""
+    parser = argparse.ArgumentParser(description="Carga histórica de notícias pelos sitemaps do arquivo da fonte")
+    parser.add_argument("--inicio", type=date.fromisoformat, required=True, help="data inicial (AAAA-MM-DD)")
+    parser.add_argument("--fim", type=date.fromisoformat, default=date.today(), help="data final (padrão: hoje)")
+    parser.add_argument("--fonte", default="g1-pegn", choices=list(SOURCES))
+    parser.add_argument("--taxa", type=float, default=DEFAULT_RATE, help="requisições por segundo ao site")
+    parser.add_argument("--processos", type=int, default=DEFAULT_EXTRACT_PROCESSES,
+                        help="processos para a extração do texto (0 = nas threads de download)")
+    parser.add_argument("--limite", type=int, help="para após processar tantos artigos (retoma na próxima execução)")
+    parser.add_argument("--checkpoint", help="arquivo de progresso (padrão: .cache/backfill/<fonte>.json)")
+    parser.add_argument("--recomecar", action="store_true", help="ignora o progresso gravado")
+    args = parser.parse_args()
+
+    if args.inicio > args.fim:
+        parser.error("--inicio deve ser anterior a --fim")
+
+    source = get_sources(args.fonte)[0]
+    scraper = PEGNScraper(sources=[source], min_request_interval=1 / args.taxa if args.taxa > 0 else 0,
+                          extract_processes=args.processos)
+    checkpoint_path = args.checkpoint or os.path.join(DEFAULT_CHECKPOINT_DIR, f"{source.name}.json")
+    try:
+        backfill = Backfill(scraper, source, args.inicio, args.fim, checkpoint_path)
+        if args.recomecar:
+            backfill.done.clear()
+
+        print(f"📚 Backfill de {source.label} de {args.inicio} a {args.fim}...")
+        result = backfill.run(limit=args.limite)
+        data = result["data"]
+        print(f"✅ {data['processados']} artigos processados em {data['duracao_s']} s; "
+              f"{data['sitemaps_concluidos']} sitemaps concluídos")
+        for name, value in data["estatisticas"].items():
+            print(f"   {name}: {value}")
+    except KeyboardInterrupt:
+        print(f"🛑 Interrompido; progresso salvo em {checkpoint_path}")
+    except ValueError as e:
+        print(f"❌ {e}")
+    finally:
+        scraper.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+News Sources - Fontes de notícias de negócios ingeridas pelo scraper
+Cada fonte define onde descobrir links (página inicial, RSS/Atom ou sitemap),
+quais URLs são artigos, as regras de metadados (autor padrão, categorias pela URL)
+e, opcionalmente, os sitemaps do arquivo histórico usados no backfill
+"""
+
+import os
+import re
+import xml.etree.ElementTree as ET
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+# Fontes usadas quando nenhuma é escolhida (nomes separados por vírgula)
+DEFAULT_SOURCE_NAMES = os.environ.get("NEWS_SOURCES", "g1-pegn")
+
+# Links por fonte a cada rodada
+DEFAULT_MAX_LINKS = 20
+
+_HREF_PATTERN = re.compile(r'href="([^"#]+)"')
+
+
+def _local(tag: str) -> str:
+    """Nome da tag XML sem o namespace"""
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_feed_links(xml_text: str) -> List[str]:
+    """Links dos itens de um feed RSS 2.0 ou Atom, na ordem do feed"""
+    root = ET.fromstring(xml_text)
+    links = []
+    for element in root.iter():
+        name = _local(element.tag)
+        if name == "item":
+            for child in element:
+                if _local(child.tag) == "link" and (child.text or "").strip():
+                    links.append(child.text.strip())
+                    break
+        elif name == "entry":
+            for child in element:
+                if _local(child.tag) == "link" and child.get("rel", "alternate") == "alternate" and child.get("href"):
+                    links.append(child.get("href"))
+                    break
+    return links
+
+
+def parse_sitemap(xml_text: str) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    """(páginas, sitemaps filhos) de um sitemap ou índice de sitemaps, como pares (loc, lastmod)"""
+    root = ET.fromstring(xml_text)
+    pages, children = [], []
+    for element in root:
+        kind = _local(element.tag)
+        if kind not in ("url", "sitemap"):
+            continue
+        loc, lastmod = "", ""
+        for child in element.iter():
+            name = _local(child.tag)
+            if name == "loc":
+                loc = (child.text or "").strip()
+            elif name in ("lastmod", "publication_date") and not lastmod:
+                lastmod = (child.text or "").strip()
+        if loc:
+            (pages if kind == "url" else children).append((loc, lastmod))
+    return pages, children
+
+
+class NewsSource:
+    """Fonte de notícias; as subclasses (ou instâncias configuradas) definem as regras"""
+
+    def __init__(self, name: str, label: str, base_url: str,
+                 link_patterns: Iterable[str] = (), article_markers: Iterable[str] = (),
+                 feeds: Iterable[str] = (), sitemaps: Iterable[str] = (),
+                 category_rules: Iterable[Tuple[str, str]] = (), max_links: int = DEFAULT_MAX_LINKS,
+                 archive_sitemaps: Iterable[str] = ()):
+        """
+        `link_patterns` reconhecem links de artigos no HTML da página inicial; `article_markers`
+        são trechos que uma URL precisa conter para ser artigo (qualquer um basta); `feeds` e
+        `sitemaps` são descobertos além (ou no lugar) da página inicial; `category_rules` são
+        pares (categoria, trecho da URL) avaliados antes das palavras-chave do texto;
+        `archive_sitemaps` são índices de sitemaps com todo o arquivo da fonte (news_backfill.py)
+        """
+        self.name = name
+        self.label = label
+        self.base_url = base_url
+        self.host = urlsplit(base_url).netloc
+        self.link_patterns = [re.compile(pattern) for pattern in link_patterns]
+        self.article_markers = tuple(article_markers)
+        self.feeds = list(feeds)
+        self.sitemaps = list(sitemaps)
+        self.category_rules = list(category_rules)
+        self.max_links = max_links
+        self.archive_sitemaps = list(archive_sitemaps)
+
+    def __repr__(self) -> str:
+        return f"NewsSource({self.name!r})"
+
+    def owns(self, url: str) -> bool:
+        host = urlsplit(url).netloc
+        return host == self.host or host.endswith("." + self.host.removeprefix("www."))
+
+    def is_article_url(self, url: str) -> bool:
+        if not self.owns(url) or url.rstrip("/") == self.base_url.rstrip("/"):
+            return False
+        return not self.article_markers or any(marker in url for marker in self.article_markers)
+
+    def extract_links(self, html: str) -> List[str]:
+        """Links de artigos da página inicial, sem repetição e na ordem em que aparecem"""
+        if self.link_patterns:
+            candidates = [match for pattern in self.link_patterns for match in pattern.findall(html)]
+        else:
+            candidates = [urljoin(self.base_url, href) for href in _HREF_PATTERN.findall(html)]
+        return list(dict.fromkeys(url for url in candidates if self.is_article_url(url)))
+
+    def discover(self, get: Callable) -> List[str]:
+        """Links de artigos recentes pela página inicial, feeds e sitemaps da fonte
+
+        `get(url)` é o GET do scraper (sessão, cortesia por host e cabeçalhos compartilhados).
+        """
+        links: List[str] = []
+        if self.link_patterns or not (self.feeds or self.sitemaps):
+            response = get(self.base_url)
+            response.raise_for_status()
+            links.extend(self.extract_links(response.text))
+        for feed in self.feeds:
+            response = get(feed)
+            response.raise_for_status()
+            links.extend(url for url in parse_feed_links(response.text) if self.is_article_url(url))
+        for sitemap in self.sitemaps:
+            response = get(sitemap)
+            response.raise_for_status()
+            pages, _ = parse_sitemap(response.text)
+            # Sitemaps de notícias trazem as mais recentes primeiro
+            links.extend(loc for loc, _ in pages if self.is_article_url(loc))
+        return list(dict.fromkeys(links))[:self.max_links]
+
+    def category_for(self, url: str) -> Optional[str]:
+        """Categoria indicada pela URL, se alguma regra da fonte casar"""
+        url_lower = url.lower()
+        for category, marker in self.category_rules:
+            if marker in url_lower:
+                return category
+        return None
+
+
+class G1PEGNSource(NewsSource):
+    """Pequenas Empresas & Grandes Negócios, no G1"""
+
+    def __init__(self):
+        super().__init__(
+            name="g1-pegn",
+            label="G1 PEGN",
+            base_url="https://g1.globo.com/empreendedorismo/pegn/",
+            link_patterns=[
+                r'href="(https://g1\.globo\.com/empreendedorismo/[^"]+)"',
+                r'href="(https://g1\.globo\.com/[^"]+/empreendedorismo/[^"]+)"',
+            ],
+            archive_sitemaps=["https://g1.globo.com/sitemap/g1/sitemap.xml"],
+        )
+
+    def is_article_url(self, url: str) -> bool:
+        # O sitemap do G1 traz todas as editorias; só interessam as de empreendedorismo
+        return (super().is_article_url(url) and '/empreendedorismo/' in url
+                and ('noticia' in url or 'artigo' in url or len(url.split('/')) > 6))
+
+
+SOURCES: Dict[str, Callable[[], NewsSource]] = {
+    "g1-pegn": G1PEGNSource,
+    "exame-pme": lambda: NewsSource(
+        name="exame-pme",
+        label="Exame",
+        base_url="https://exame.com/pme/",
+        feeds=["https://exame.com/pme/feed/"],
+        article_markers=["/pme/"],
+        category_rules=[("Startups", "/startups/")],
+    ),
+    "infomoney-negocios": lambda: NewsSource(
+        name="infomoney-negocios",
+        label="InfoMoney",
+        base_url="https://www.infomoney.com.br/negocios/",
+        feeds=["https://www.infomoney.com.br/negocios/feed/"],
+        article_markers=["/negocios/"],
+        category_rules=[("Startups", "/startups/"), ("Investimentos", "/onde-investir/")],
+    ),
+    "agencia-sebrae": lambda: NewsSource(
+        name="agencia-sebrae",
+        label="Agência Sebrae",
+        base_url="https://agenciasebrae.com.br/",
+        feeds=["https://agenciasebrae.com.br/feed/"],
+        category_rules=[("Pequenas Empresas", "/pequenos-negocios/")],
+    ),
+}
+
+
+def get_sources(names: Optional[str] = None) -> List[NewsSource]:
+    """Instancia as fontes pelo nome (separados por vírgula); "todas" devolve todas"""
+    names = names or DEFAULT_SOURCE_NAMES
+    selected = list(SOURCES) if names.strip() == "todas" else [n.strip() for n in names.split(",") if n.strip()]
+    unknown = [name for name in selected if name not in SOURCES]
+    if unknown:
+        raise ValueError(f"Fontes desconhecidas: {', '.join(unknown)} (disponíveis: {', '.join(SOURCES)})")
+    return [SOURCES[name]() for name in selected]
@@ -1,198 +1,528 @@
 #!/usr/bin/env python3
 """
 Scraper para notícias de empreendedorismo do G1 PEGN
-Extrai notícias atuais sobre pequenas e grandes empresas
+Extrai notícias atuais sobre pequenas e grandes empresas; outras fontes de
+notícias de negócios (news_sources.py) podem ser ingeridas na mesma rodada
 """
 
-import requests
+import argparse
 import trafilatura
-import json
+import sys
+import os
 from datetime import datetime
 import re
 import time
+import hashlib
 import logging
+import multiprocessing
+import threading
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from article_fingerprint import ArticleFingerprints, canonicalize_url
+from article_store import ArticleStore
+from fetch_pool import HostThrottle
+from http_session import get_session
+from ndjson_output import write_ndjson
+from news_sources import SOURCES, get_sources
+from records import Article
+from search_index import ArticleSearchIndex
+from snapshot_store import SnapshotStore
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Palavras-chave comuns de empreendedorismo (minúsculas → forma original da tag)
+TAG_KEYWORDS = {keyword.lower(): keyword for keyword in [
+    'startup', 'empreendedorismo', 'negócio', 'empresa', 'inovação',
+    'tecnologia', 'investimento', 'mercado', 'vendas', 'marketing',
+    'gestão', 'liderança', 'pequena empresa', 'MEI', 'microempresa'
+]}
+
+# (categoria, trecho da URL, palavra-chave no texto), em ordem de prioridade
+CATEGORY_RULES = [
+    ('Startups', 'startup', 'startup'),
+    ('Pequenas Empresas', 'pequenas-empresas', 'pequena empresa'),
+    ('Grandes Empresas', 'grandes-empresas', 'grande empresa'),
+    ('Investimentos', 'investimento', 'investimento'),
+]
+
+# Siglas só contam como palavra inteira ("mei" não deve casar com "meio")
+WHOLE_WORD_KEYWORDS = {'mei'}
+
+# Um único padrão com todas as palavras-chave; o lookahead permite achados sobrepostos
+KEYWORD_PATTERN = re.compile('(?=({}))'.format('|'.join(
+    rf'\b{re.escape(keyword)}\b' if keyword in WHOLE_WORD_KEYWORDS else re.escape(keyword)
+    for keyword in sorted(set(TAG_KEYWORDS) | {rule[2] for rule in CATEGORY_RULES}, key=len, reverse=True)
+)))
+
+# Processos da etapa de extração: a análise do HTML usa CPU e, nas threads de download,
+# ficaria serializada pelo GIL (0 ou 1 = extrair na própria thread de download); cada
+# processo "spawn" carrega o trafilatura inteiro, por isso o padrão é pequeno
+DEFAULT_EXTRACT_PROCESSES = int(os.environ.get("PEGN_EXTRACT_PROCESSES", min(2, os.cpu_count() or 1)))
+
+# Artigos mais recentes do acervo publicados em pegn_news.json (o acervo cresce sem limite
+# com o backfill; o snapshot servido ao site fica com tamanho fixo)
+PUBLISHED_ARTICLES = int(os.environ.get("PEGN_PUBLISHED_ARTICLES", 500))
+
+# Página baixada, aguardando a extração
+PendingPage = namedtuple("PendingPage", "url html content_hash etag last_modified source")
+
+
+def extract_article(url, html, source):
+    """Extrai título, texto, tags e categoria do HTML de um artigo
+
+    Função de módulo (e não método) para poder rodar nos processos de extração.
+    """
+    # Uma única análise do documento: conteúdo e metadados de uma vez
+    document = trafilatura.bare_extraction(html, include_comments=False, with_metadata=True)
+    
+    if not document:
+        return None
+    
+    data = document.as_dict() if hasattr(document, 'as_dict') else document
+    title = (data.get('title') or '').strip()
+    text = (data.get('text') or '').strip()
+    
+    # Filtrar artigos sem conteúdo suficiente
+    if len(text) < 200 or not title:
+        return None
+    
+    # Buscar tags e categorias no texto extraído (não no HTML bruto)
+    matched = match_keywords(f"{title}\n{text}")
+    
+    return Article(
+        title=title,
+        content=text,
+        author=data.get('author') or source.label,
+        date=data.get('date') or datetime.now().isoformat(),
+        url=url,
+        category=source.category_for(url) or extract_category(url, text, matched),
+        tags=extract_tags(text, matched),
+        summary=generate_summary(text),
+        scraped_at=datetime.now().isoformat(),
+        source=source.name
+    )
+
+
+def match_keywords(text):
+    """Encontra, em uma única passada, todas as palavras-chave presentes no texto"""
+    return {match.group(1) for match in KEYWORD_PATTERN.finditer(text.lower())}
+
+
+def extract_tags(text, matched=None):
+    """Extrair tags/palavras-chave do texto do artigo"""
+    if matched is None:
+        matched = match_keywords(text)
+    return [TAG_KEYWORDS[keyword].title() for keyword in TAG_KEYWORDS if keyword in matched]
+
+
+def extract_category(url, text, matched=None):
+    """Determinar categoria do artigo"""
+    if matched is None:
+        matched = match_keywords(text)
+    url_lower = url.lower()
+    for category, url_marker, keyword in CATEGORY_RULES:
+        if url_marker in url_lower or keyword in matched:
+            return category
+    return 'Empreendedorismo'
+
+
+def generate_summary(content):
+    """Gerar resumo do artigo"""
+    if not content or len(content) < 200:
+        return ""
+    
+    # Pegar os primeiros 2 parágrafos ou até 300 caracteres; o texto do trafilatura
+    # separa os parágrafos por uma quebra de linha simples (sem linha em branco)
+    separator = '\n\n' if '\n\n' in content else '\n'
+    paragraphs = [paragraph.strip() for paragraph in content.split(separator) if paragraph.strip()]
+    summary = paragraphs[0]
+    
+    if len(summary) < 150 and len(paragraphs) > 1:
+        summary += " " + paragraphs[1]
+    
+    # Limitar a 300 caracteres
+    if len(summary) > 300:
+        summary = summary[:297] + "..."
+    
+    return summary.strip()
+
 class PEGNScraper:
-    def __init__(self):
-        self.base_url = "https://g1.globo.com/empreendedorismo/pegn/"
+    def __init__(self, max_workers=6, per_host_concurrency=3, min_request_interval=0.25,
+                 store=None, recheck_after=6 * 3600, search_index=None, fingerprints=None, sources=None,
+                 extract_processes=DEFAULT_EXTRACT_PROCESSES, max_pending=None):
+        # Fontes de notícias (padrão: G1 PEGN, ou as de NEWS_SOURCES); todas compartilham
+        # a sessão, o pool de downloads, o acervo, o índice de busca e as impressões digitais
+        self.sources = sources if sources is not None else get_sources()
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
+        # Sessão compartilhada: mantém as conexões com cada site abertas entre artigos
+        self.session = get_session()
+        # Até `per_host_concurrency` downloads simultâneos por site, espaçados por `min_request_interval`
+        self.max_workers = max_workers
+        self.throttle = HostThrottle(per_host_concurrency, min_request_interval)
+        # Acervo de artigos já raspados; URLs verificadas há menos de `recheck_after` s não são baixadas
+        self.store = store if store is not None else ArticleStore()
+        self.recheck_after = recheck_after
+        # Índice de busca do acervo, atualizado a cada artigo extraído
+        self.search_index = search_index if search_index is not None else ArticleSearchIndex()
+        self._index_synced = False
+        # Impressões digitais (URL canônica e SimHash) para pular notícias repetidas
+        self.fingerprints = fingerprints if fingerprints is not None else ArticleFingerprints()
+        self._fingerprints_synced = False
+        # Extração em processos separados, criados na primeira vez que forem necessários;
+        # `max_pending` limita as páginas em andamento (baixando ou aguardando extração)
+        self.extract_processes = extract_processes
+        self.max_pending = max_pending or 2 * max(max_workers, extract_processes)
+        self._extractor = None
+        self._extractor_lock = threading.Lock()
     
     def fetch_latest_news(self, max_articles=10):
         """Buscar últimas notícias do PEGN"""
+        news_data = list(self.iter_latest_news(max_articles))
+        logger.info(f"Total de artigos processados: {len(news_data)}")
+        return news_data
+    
+    def iter_latest_news(self, max_articles=10):
+        """Gera os artigos (até `max_articles` por fonte) à medida que cada um termina de ser processado"""
         try:
-            logger.info(f"Buscando notícias em: {self.base_url}")
-            
-            # Fazer requisição para página principal
-            response = requests.get(self.base_url, headers=self.headers, timeout=30)
-            response.raise_for_status()
-            
-            # Extrair conteúdo da página
-            downloaded = response.text
-            content = trafilatura.extract(downloaded, output_format='json')
-            
-            if not content:
-                logger.error("Não foi possível extrair conteúdo da página")
-                return []
-            
-            content_json = json.loads(content)
+            jobs = self.discover_links(max_articles)
+        except Exception as e:
+            logger.error(f"Erro ao buscar notícias: {e}")
+            return
+        
+        # Cópias devolvem o artigo original, que só deve sair uma vez
+        seen = set()
+        for i, (article_url, article_data) in enumerate(self.iter_scrape(jobs)):
+            logger.info(f"Artigo {i+1}/{len(jobs)} concluído: {article_url}")
+            if article_data and article_data.url not in seen:
+                seen.add(article_data.url)
+                yield article_data.to_dict()
+    
+    def discover_links(self, max_articles=None):
+        """Pares (url, fonte) dos artigos recentes de todas as fontes, descobertos em paralelo"""
+        with ThreadPoolExecutor(max_workers=max(1, len(self.sources))) as executor:
+            discoveries = [(source, executor.submit(source.discover, self._get)) for source in self.sources]
             
-            # Buscar links de artigos na página HTML
-            articles = self.extract_article_links(downloaded)
+            if not self._fingerprints_synced:
+                self.sync_fingerprints()
             
-            # Processar cada artigo
-            news_data = []
-            for i, article_url in enumerate(articles[:max_articles]):
+            jobs = []
+            seen_links = set()
+            for source, future in discoveries:
                 try:
-                    logger.info(f"Processando artigo {i+1}/{len(articles)}: {article_url}")
-                    article_data = self.scrape_article(article_url)
-                    if article_data:
-                        news_data.append(article_data)
-                    time.sleep(1)  # Delay para não sobrecarregar o servidor
+                    links = future.result()
                 except Exception as e:
-                    logger.error(f"Erro ao processar artigo {article_url}: {e}")
+                    logger.error(f"Erro ao buscar notícias de {source.name}: {e}")
                     continue
-            
-            logger.info(f"Total de artigos processados: {len(news_data)}")
-            return news_data
-            
-        except Exception as e:
-            logger.error(f"Erro ao buscar notícias: {e}")
-            return []
-    
-    def extract_article_links(self, html_content):
-        """Extrair links de artigos da página principal"""
-        # Padrões de URL do G1 PEGN
-        patterns = [
-            r'href="(https://g1\.globo\.com/empreendedorismo/[^"]+)"',
-            r'href="(https://g1\.globo\.com/[^"]+/empreendedorismo/[^"]+)"',
-        ]
-        
-        links = set()
-        for pattern in patterns:
-            matches = re.findall(pattern, html_content)
-            for match in matches:
-                if 'noticia' in match or 'artigo' in match or len(match.split('/')) > 6:
-                    links.add(match)
-        
-        return list(links)[:20]  # Limitar a 20 links
+                
+                logger.info(f"{len(links)} links encontrados em {source.name}")
+                new_links = [url for url in self.dedupe_links(links) if canonicalize_url(url) not in seen_links]
+                for article_url in new_links[:max_articles]:
+                    seen_links.add(canonicalize_url(article_url))
+                    jobs.append((article_url, source))
+        return jobs
+    
+    def fetch_article_links(self):
+        """Descobre os links de artigos recentes de todas as fontes"""
+        return [url for url, _ in self.discover_links()]
+    
+    def source_for(self, url):
+        """Fonte dona da URL (a primeira configurada, se nenhuma for)"""
+        for source in self.sources:
+            if source.owns(url):
+                return source
+        return self.sources[0]
+    
+    def _get(self, url, headers=None):
+        """GET pela sessão compartilhada, respeitando a cortesia com o host"""
+        with self.throttle.slot(url):
+            return self.session.get(url, headers={**self.headers, **(headers or {})}, timeout=30)
+    
+    def dedupe_links(self, links):
+        """Uma URL por notícia: caminhos de seções diferentes levam ao mesmo artigo"""
+        unique = {}
+        for url in links:
+            unique.setdefault(canonicalize_url(url), url)
+        return list(unique.values())
+    
+    def extract_article_links(self, html_content, source=None):
+        """Extrair links de artigos da página principal de uma fonte (padrão: a primeira)"""
+        source = source or self.sources[0]
+        return self.dedupe_links(source.extract_links(html_content))[:source.max_links]
     
-    def scrape_article(self, url):
-        """Extrair dados de um artigo específico"""
+    def scrape_article(self, url, source=None):
+        """Extrair dados de um artigo específico, reaproveitando o acervo quando nada mudou"""
         try:
-            response = requests.get(url, headers=self.headers, timeout=30)
-            response.raise_for_status()
-            
-            # Usar trafilatura para extrair conteúdo estruturado
-            content = trafilatura.extract(
-                response.text, 
-                output_format='json',
-                include_comments=False,
-                include_formatting=True
-            )
-            
-            if not content:
-                return None
-            
-            data = json.loads(content)
-            
-            # Extrair informações específicas do HTML se necessário
-            html = response.text
-            
-            # Buscar tags e categorias
-            tags = self.extract_tags(html)
-            category = self.extract_category(url, html)
+            result = self.fetch_article(url, source)
+            if not isinstance(result, PendingPage):
+                return result
             
-            article_data = {
-                'title': data.get('title', '').strip(),
-                'content': data.get('text', '').strip(),
-                'author': data.get('author', 'G1 PEGN'),
-                'date': data.get('date', datetime.now().isoformat()),
-                'url': url,
-                'category': category,
-                'tags': tags,
-                'summary': self.generate_summary(data.get('text', '')),
-                'scraped_at': datetime.now().isoformat()
-            }
-            
-            # Filtrar artigos sem conteúdo suficiente
-            if len(article_data['content']) < 200 or not article_data['title']:
-                return None
-            
-            return article_data
+            pool = self._extraction_pool()
+            if pool is None:
+                article_data = extract_article(result.url, result.html, result.source)
+            else:
+                try:
+                    article_data = pool.submit(extract_article, result.url, result.html, result.source).result()
+                except BrokenProcessPool:
+                    self._discard_broken_pool(pool)
+                    raise
+            return self.store_extracted(result, article_data)
             
         except Exception as e:
             logger.error(f"Erro ao extrair artigo {url}: {e}")
             return None
     
-    def extract_tags(self, html):
-        """Extrair tags/palavras-chave do HTML"""
-        tags = set()
+    def iter_scrape(self, jobs):
+        """Raspa os pares (url, fonte) de `jobs` em pipeline, gerando (url, artigo ou None)
+
+        Os downloads rodam no pool de threads e a extração no pool de processos; no máximo
+        `max_pending` páginas ficam em andamento entre as etapas, e `jobs` (que pode ser um
+        gerador longo, como o do backfill) só é consumido quando há vaga. Se um processo
+        de extração morrer, o pool é recriado e as páginas afetadas são extraídas de novo uma vez.
+        """
+        jobs = iter(jobs)
+        pool = self._extraction_pool()
+        io = ThreadPoolExecutor(max_workers=self.max_workers)
+        fetching, extracting = {}, {}
         
-        # Buscar palavras-chave comuns de empreendedorismo
-        keywords = [
-            'startup', 'empreendedorismo', 'negócio', 'empresa', 'inovação',
-            'tecnologia', 'investimento', 'mercado', 'vendas', 'marketing',
-            'gestão', 'liderança', 'pequena empresa', 'MEI', 'microempresa'
-        ]
+        def refill():
+            while len(fetching) + len(extracting) < self.max_pending:
+                job = next(jobs, None)
+                if job is None:
+                    return
+                url, source = job
+                fetching[io.submit(self.fetch_article, url, source)] = url
         
-        html_lower = html.lower()
-        for keyword in keywords:
-            if keyword in html_lower:
-                tags.add(keyword.title())
+        def extract(page, retries=0):
+            # Sem pool de processos, a extração usa as próprias threads de download
+            nonlocal pool
+            try:
+                future = (pool or io).submit(extract_article, page.url, page.html, page.source)
+            except BrokenProcessPool:
+                pool = self._discard_broken_pool(pool)
+                future = (pool or io).submit(extract_article, page.url, page.html, page.source)
+            extracting[future] = (page, retries)
         
-        return list(tags)
-    
-    def extract_category(self, url, html):
-        """Determinar categoria do artigo"""
-        if 'startup' in url.lower() or 'startup' in html.lower():
-            return 'Startups'
-        elif 'pequenas-empresas' in url.lower() or 'pequena empresa' in html.lower():
-            return 'Pequenas Empresas'
-        elif 'grandes-empresas' in url.lower() or 'grande empresa' in html.lower():
-            return 'Grandes Empresas'
-        elif 'investimento' in url.lower() or 'investimento' in html.lower():
-            return 'Investimentos'
-        else:
-            return 'Empreendedorismo'
+        try:
+            refill()
+            while fetching or extracting:
+                done, _ = wait(set(fetching) | set(extracting), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in fetching:
+                        url = fetching.pop(future)
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            logger.error(f"Erro ao baixar artigo {url}: {e}")
+                            yield url, None
+                            continue
+                        if isinstance(result, PendingPage):
+                            extract(result)
+                        else:
+                            yield url, result
+                    else:
+                        page, retries = extracting.pop(future)
+                        try:
+                            article_data = self.store_extracted(page, future.result())
+                        except BrokenProcessPool as e:
+                            if retries == 0:
+                                logger.warning(f"Processo de extração encerrado; recriando o pool ({page.url})")
+                                # O pool quebrado recusa o envio e é trocado em extract()
+                                extract(page, retries=1)
+                                continue
+                            logger.error(f"Erro ao extrair artigo {page.url}: {e}")
+                            article_data = None
+                        except Exception as e:
+                            logger.error(f"Erro ao extrair artigo {page.url}: {e}")
+                            article_data = None
+                        yield page.url, article_data
+                refill()
+        finally:
+            for future in extracting:
+                future.cancel()
+            io.shutdown(wait=False, cancel_futures=True)
     
-    def generate_summary(self, content):
-        """Gerar resumo do artigo"""
-        if not content or len(content) < 200:
-            return ""
+    def fetch_article(self, url, source=None):
+        """Etapa de download: devolve o artigo (ou None) quando não há o que extrair,
+        ou a PendingPage com o HTML baixado para a etapa de extração"""
+        source = source or self.source_for(url)
+        stored = self.store.get(url)
+        if stored and time.time() - stored["checked_at"] < self.recheck_after:
+            return stored["article"]
+        
+        # Mesma notícia já raspada por outro caminho: nem baixa
+        original = self.fingerprints.known_as(url)
+        if original:
+            return self._stored_article(original)
+        
+        # GET condicional com os validadores da última visita
+        headers = {}
+        if stored and stored["etag"]:
+            headers['If-None-Match'] = stored["etag"]
+        if stored and stored["last_modified"]:
+            headers['If-Modified-Since'] = stored["last_modified"]
+        
+        response = self._get(url, headers)
+        if response.status_code == 304 and stored:
+            self.store.touch(url)
+            return stored["article"]
+        response.raise_for_status()
         
-        # Pegar os primeiros 2 parágrafos ou até 300 caracteres
-        paragraphs = content.split('\n\n')
-        summary = paragraphs[0]
+        content_hash = hashlib.sha256(response.content).hexdigest()
+        if stored and stored["content_hash"] == content_hash:
+            self.store.touch(url)
+            return stored["article"]
         
-        if len(summary) < 150 and len(paragraphs) > 1:
-            summary += " " + paragraphs[1]
+        etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
         
-        # Limitar a 300 caracteres
-        if len(summary) > 300:
-            summary = summary[:297] + "..."
+        # rel=canonical aponta para uma notícia já raspada: não extrai
+        original = self.fingerprints.known_as(url, response.text)
+        if original:
+            self.store.save(url, None, content_hash, etag, last_modified)
+            return self._stored_article(original)
         
-        return summary.strip()
+        return PendingPage(url, response.text, content_hash, etag, last_modified, source)
+    
+    def store_extracted(self, page, article_data):
+        """Etapa final: descarta cópias, guarda e indexa o artigo extraído da página"""
+        # Texto quase idêntico ao de outra notícia (versões republicadas): não guarda nem indexa
+        original = self.fingerprints.claim(article_data, page.html) if article_data else None
+        if original:
+            logger.info(f"Artigo {page.url} é cópia de {original}")
+            self.store.save(page.url, None, page.content_hash, page.etag, page.last_modified)
+            return self._stored_article(original)
+        
+        self.store.save(page.url, article_data, page.content_hash, page.etag, page.last_modified)
+        if article_data:
+            self.search_index.add(article_data)
+        return article_data
+    
+    def _extraction_pool(self):
+        """Pool de processos da extração (None quando a extração roda nas threads)"""
+        if self.extract_processes <= 1:
+            return None
+        with self._extractor_lock:
+            if self._extractor is None:
+                # "spawn": o serviço tem threads em andamento, e fork com threads não é seguro
+                self._extractor = ProcessPoolExecutor(
+                    max_workers=self.extract_processes, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._extractor
+    
+    def _discard_broken_pool(self, broken):
+        """Descarta o pool com um processo morto (ex.: sem memória) e devolve um novo"""
+        with self._extractor_lock:
+            if self._extractor is broken:
+                self._extractor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+        return self._extraction_pool()
+    
+    def close(self):
+        """Encerra os processos de extração"""
+        with self._extractor_lock:
+            if self._extractor is not None:
+                self._extractor.shutdown(cancel_futures=True)
+                self._extractor = None
+    
+    def _stored_article(self, url):
+        stored = self.store.get(url)
+        return stored["article"] if stored else None
+    
+    def sync_fingerprints(self):
+        """Registra as impressões digitais dos artigos do acervo que ainda não as têm"""
+        if len(self.fingerprints) < len(self.store):
+            missing = (article for article in self.store.all_articles() if article.url not in self.fingerprints)
+            count = self.fingerprints.add_many(missing)
+            logger.info(f"{count} artigos do acervo registrados para detecção de duplicatas")
+        self._fingerprints_synced = True
+    
+    def sync_search_index(self):
+        """Indexa os artigos do acervo que ainda não estão no índice de busca"""
+        if len(self.search_index) < len(self.store):
+            missing = (article for article in self.store.all_articles() if article.url not in self.search_index)
+            count = self.search_index.add_many(missing)
+            logger.info(f"{count} artigos do acervo adicionados ao índice de busca")
+        self._index_synced = True
+    
+    def search_articles(self, query="", tags=None, category=None, limit=20):
+        """Busca no acervo por relevância (BM25), com filtro opcional de tags e categoria"""
+        if not self._index_synced:
+            self.sync_search_index()
+        
+        results = []
+        for url, score in self.search_index.search(query, tags, category, limit):
+            stored = self.store.get(url)
+            if stored and stored["article"]:
+                results.append({**stored["article"].to_dict(), 'score': round(score, 4)})
+        return results
+    
+    def extract_article(self, url, html, source=None):
+        """Extrai título, texto, tags e categoria do HTML de um artigo"""
+        return extract_article(url, html, source or self.source_for(url))
+    
+    def match_keywords(self, text):
+        return match_keywords(text)
+    
+    def extract_tags(self, text, matched=None):
+        return extract_tags(text, matched)
+    
+    def extract_category(self, url, text, matched=None):
+        return extract_category(url, text, matched)
+    
+    def generate_summary(self, content):
+        return generate_summary(content)
 
 def main():
     """Função principal para executar o scraper"""
-    scraper = PEGNScraper()
+    parser = argparse.ArgumentParser(description="Busca notícias de empreendedorismo do G1 PEGN (e de outras fontes)")
+    parser.add_argument("--ndjson", metavar="ARQUIVO",
+                        help="grava cada artigo como uma linha JSON assim que é processado (- para stdout)")
+    parser.add_argument("--max-articles", type=int, default=15, help="artigos por fonte")
+    parser.add_argument("--fontes", help=f"fontes separadas por vírgula, ou 'todas' ({', '.join(SOURCES)})")
+    parser.add_argument("--processos", type=int, default=DEFAULT_EXTRACT_PROCESSES,
+                        help="processos para a extração do texto (0 = nas threads de download)")
+    parser.add_argument("--buscar", metavar="CONSULTA", help="busca no acervo já raspado em vez de buscar notícias")
+    parser.add_argument("--tag", action="append", help="filtra a busca por tag (pode repetir)")
+    parser.add_argument("--categoria", help="filtra a busca por categoria")
+    parser.add_argument("--pretty", action="store_true", help="grava o JSON indentado (padrão: compacto)")
+    args = parser.parse_args()
+    
+    try:
+        sources = get_sources(args.fontes)
+    except ValueError as e:
+        parser.error(str(e))
+    scraper = PEGNScraper(sources=sources, extract_processes=args.processos)
+    
+    if args.buscar is not None or args.tag or args.categoria:
+        results = scraper.search_articles(args.buscar or "", args.tag, args.categoria)
+        print(f"🔎 {len(results)} artigos encontrados")
+        for i, article in enumerate(results):
+            print(f"\n📰 {i+1}. {article['title']} ({article['score']})")
+            print(f"   📅 {article['date']}  🏷️  {article['category']}  📡 {article.get('source') or 'g1-pegn'}")
+            print(f"   🔗 {article['url']}")
+        return
+    
+    if args.ndjson:
+        count = write_ndjson(scraper.iter_latest_news(max_articles=args.max_articles), args.ndjson)
+        scraper.close()
+        print(f"✅ {count} notícias gravadas em NDJSON", file=sys.stderr)
+        return
     
     try:
         print("🔍 Iniciando busca por notícias de empreendedorismo...")
-        news = scraper.fetch_latest_news(max_articles=15)
+        news = scraper.fetch_latest_news(max_articles=args.max_articles)
         
         if news:
-            # Salvar em arquivo JSON
+            # Publicar os artigos mais recentes do acervo (novos mesclados aos anteriores) em arquivo JSON
             output_file = 'pegn_news.json'
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(news, f, ensure_ascii=False, indent=2)
+            corpus = [article.to_dict() for article in scraper.store.all_articles(limit=PUBLISHED_ARTICLES)]
+            SnapshotStore("pegn_news").publish(corpus, args.pretty)
             
-            print(f"✅ {len(news)} notícias extraídas e salvas em {output_file}")
+            print(f"✅ {len(news)} notícias atuais, {len(corpus)} mais recentes do acervo salvas em {output_file}")
             
             # Mostrar preview
             for i, article in enumerate(news[:3]):
@@ -205,6 +535,8 @@ def main():
             
     except Exception as e:
         print(f"❌ Erro durante execução: {e}")
+    finally:
+        scraper.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
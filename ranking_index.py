@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Ranking Index - Rankings materializados dos municípios por métrica e ano
+Montados uma vez a cada atualização dos dados; depois respondem top-k, posição,
+percentil e vizinhos de um município sem reordenar nada
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class MetricRanking:
+    def __init__(self, metric: str, year: int, entries: Iterable[Tuple[str, str, float]],
+                 higher_is_better: bool = True):
+        """`entries` são tuplas (código, município, valor); valores ausentes são ignorados"""
+        self.metric = metric
+        self.year = year
+        self.higher_is_better = higher_is_better
+
+        ordered = sorted(
+            (entry for entry in entries if entry[2] is not None),
+            key=lambda entry: entry[2],
+            reverse=higher_is_better,
+        )
+        self._codes = [codigo for codigo, _, _ in ordered]
+        self._names = [nome for _, nome, _ in ordered]
+        self._values = [valor for _, _, valor in ordered]
+        # Valores em ordem crescente, para busca binária
+        self._ascending = self._values[::-1] if higher_is_better else list(self._values)
+        self._index: Dict[str, int] = {}
+        for i, (codigo, nome) in enumerate(zip(self._codes, self._names)):
+            self._index[codigo] = i
+            self._index.setdefault(nome, i)
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def _entry(self, i: int) -> Dict[str, Any]:
+        return {
+            "posicao": i + 1,
+            "codigo": self._codes[i],
+            "municipio": self._names[i],
+            "valor": self._values[i],
+        }
+
+    def top(self, k: int = 10) -> List[Dict[str, Any]]:
+        """Os `k` primeiros colocados"""
+        return [self._entry(i) for i in range(min(k, len(self)))]
+
+    def position(self, municipio: str) -> Optional[int]:
+        """Posição (1 = melhor) pelo código IBGE ou pelo nome"""
+        i = self._index.get(str(municipio))
+        return None if i is None else i + 1
+
+    def entry(self, municipio: str) -> Optional[Dict[str, Any]]:
+        i = self._index.get(str(municipio))
+        return None if i is None else self._entry(i)
+
+    def percentile_of_value(self, valor: float) -> float:
+        """Percentual de municípios com desempenho igual ou pior que `valor`"""
+        if not self._ascending:
+            return 0.0
+        if self.higher_is_better:
+            worse_or_equal = bisect_right(self._ascending, valor)
+        else:
+            worse_or_equal = len(self._ascending) - bisect_left(self._ascending, valor)
+        return 100.0 * worse_or_equal / len(self._ascending)
+
+    def percentile(self, municipio: str) -> Optional[float]:
+        i = self._index.get(str(municipio))
+        return None if i is None else self.percentile_of_value(self._values[i])
+
+    def position_of_value(self, valor: float) -> int:
+        """Posição que um município com `valor` ocuparia no ranking"""
+        if self.higher_is_better:
+            return len(self._ascending) - bisect_right(self._ascending, valor) + 1
+        return bisect_left(self._ascending, valor) + 1
+
+    def neighbors(self, municipio: str, k: int = 1) -> Dict[str, List[Dict[str, Any]]]:
+        """Até `k` municípios imediatamente acima e abaixo no ranking"""
+        i = self._index.get(str(municipio))
+        if i is None:
+            return {"acima": [], "abaixo": []}
+        return {
+            "acima": [self._entry(j) for j in range(max(0, i - k), i)],
+            "abaixo": [self._entry(j) for j in range(i + 1, min(len(self), i + k + 1))],
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "metric": self.metric,
+            "year": self.year,
+            "higher_is_better": self.higher_is_better,
+            "entries": [list(entry) for entry in zip(self._codes, self._names, self._values)],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MetricRanking":
+        return cls(data["metric"], data["year"], [tuple(entry) for entry in data["entries"]],
+                   data.get("higher_is_better", True))
+
+
+class RankingIndex:
+    def __init__(self):
+        self.rankings: Dict[Tuple[str, int], MetricRanking] = {}
+
+    def add(self, ranking: MetricRanking):
+        self.rankings[(ranking.metric, ranking.year)] = ranking
+
+    def add_records(self, records: Iterable[Dict[str, Any]], metrics: Iterable[str], year: int,
+                    lower_is_better: Iterable[str] = ()):
+        """Materializa um ranking por métrica a partir de registros com `codigo` e `municipio`"""
+        records = list(records)
+        lower = set(lower_is_better)
+        for metric in metrics:
+            entries = [(str(r.get("codigo")), r.get("municipio"), r.get(metric)) for r in records]
+            self.add(MetricRanking(metric, year, entries, higher_is_better=metric not in lower))
+
+    def get(self, metric: str, year: Optional[int] = None) -> Optional[MetricRanking]:
+        """Ranking da métrica no ano informado (ou no mais recente)"""
+        if year is not None:
+            return self.rankings.get((metric, year))
+        years = [y for m, y in self.rankings if m == metric]
+        return self.rankings[(metric, max(years))] if years else None
+
+    def metrics(self) -> List[Dict[str, Any]]:
+        return [
+            {"metric": metric, "year": year, "count": len(ranking)}
+            for (metric, year), ranking in sorted(self.rankings.items())
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"rankings": [ranking.to_dict() for ranking in self.rankings.values()]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RankingIndex":
+        index = cls()
+        for ranking in data.get("rankings", []):
+            index.add(MetricRanking.from_dict(ranking))
+        return index
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Records - Tipos de registro compactos compartilhados pelos fetchers
+Dataclasses com __slots__ (sem __dict__ por instância) e conversão direta
+para/de dicionários e JSON, no mesmo formato que as APIs já devolvem
+"""
+
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional, Type, TypeVar
+
+from serialization import dumps, loads
+
+R = TypeVar("R", bound="Record")
+
+
+class Record:
+    """Conversões comuns; cada subclasse é uma dataclass com slots"""
+    __slots__ = ()
+    # Campos omitidos da saída quando vazios (None)
+    _optional: tuple = ()
+    _names: tuple = ()
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {}
+        for name in self._names:
+            value = getattr(self, name)
+            if value is None and name in self._optional:
+                continue
+            data[name] = value
+        return data
+
+    @classmethod
+    def from_dict(cls: Type[R], data: Dict[str, Any]) -> R:
+        """Cria o registro ignorando chaves desconhecidas"""
+        return cls(**{name: data[name] for name in cls._names if name in data})
+
+    def to_json(self) -> str:
+        return dumps(self.to_dict())
+
+    @classmethod
+    def from_json(cls: Type[R], text: str) -> R:
+        return cls.from_dict(loads(text))
+
+
+def _finalize(cls):
+    """Guarda os nomes dos campos (e quais são opcionais) para as conversões"""
+    cls._names = tuple(f.name for f in fields(cls))
+    cls._optional = tuple(f.name for f in fields(cls) if f.default is None)
+    return cls
+
+
+@_finalize
+@dataclass(slots=True)
+class MunicipalIndicator(Record):
+    """Indicadores de um município (sociais, econômicos e de gastos) e sua posição no ranking"""
+    municipio: str
+    codigo: str
+    ano: Optional[int] = None
+    populacao: Optional[int] = None
+    pib: Optional[float] = None
+    pib_per_capita: Optional[float] = None
+    idhm: Optional[float] = None
+    gini: Optional[float] = None
+    area_km2: Optional[float] = None
+    densidade_dem: Optional[float] = None
+    fonte: Optional[str] = None
+    saude: Optional[float] = None
+    educacao: Optional[float] = None
+    total: Optional[float] = None
+    status: Optional[str] = None
+    rank_color: Optional[str] = None
+
+
+@_finalize
+@dataclass(slots=True)
+class BudgetLine(Record):
+    """Linha de um demonstrativo do RREO"""
+    conta: str
+    coluna: str = ""
+    valor_empenhado: float = 0.0
+
+
+@_finalize
+@dataclass(slots=True)
+class Article(Record):
+    """Artigo de notícia extraído de uma das fontes (news_sources.py)"""
+    title: str
+    content: str
+    author: str = ""
+    date: str = ""
+    url: str = ""
+    category: str = ""
+    tags: List[str] = field(default_factory=list)
+    summary: str = ""
+    scraped_at: str = ""
+    source: str = ""
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Refresh Scheduler - Atualização periódica dos conjuntos de dados em segundo plano
+Cada conjunto tem sua própria cadência (com variação aleatória), nunca roda em
+duplicidade e, em caso de falha, é tentado de novo com espera crescente.
+O resultado é publicado como snapshot, para que as rotas apenas leiam arquivos prontos
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from snapshot_store import SnapshotStore
+
+logger = logging.getLogger(__name__)
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+# Atraso máximo da primeira execução quando não há snapshot recente (evita disparar tudo junto)
+STARTUP_SPREAD = 5.0
+
+
+class RefreshJob:
+    def __init__(self, name: str, produce: Callable[[], Any], interval: float,
+                 jitter: float = 0.1, retry_after: float = 60.0, store: Optional[SnapshotStore] = None):
+        self.name = name
+        self.produce = produce
+        self.interval = interval
+        self.jitter = jitter
+        self.retry_after = retry_after
+        self.store = store if store is not None else SnapshotStore(name)
+
+        self.running = False
+        self.failures = 0
+        self.next_run = 0.0
+        self.last_success: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_duration: Optional[float] = None
+
+    def _jittered(self, delay: float) -> float:
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def schedule_initial(self, now: float):
+        """Agenda a primeira execução a partir da idade do snapshot já publicado"""
+        latest = self.store.latest_path()
+        published_at = None
+        if latest:
+            try:
+                published_at = os.path.getmtime(latest)
+            except OSError:
+                pass
+
+        if published_at is not None and now - published_at < self.interval:
+            self.last_success = published_at
+            self.next_run = published_at + self._jittered(self.interval)
+        else:
+            self.next_run = now + random.uniform(0, STARTUP_SPREAD)
+
+    def schedule_next(self, now: float, succeeded: bool):
+        """Próxima execução: cadência normal após sucesso, espera crescente após falha"""
+        if succeeded:
+            self.failures = 0
+            delay = self.interval
+        else:
+            self.failures += 1
+            delay = min(self.interval, self.retry_after * 2 ** (self.failures - 1))
+        self.next_run = now + self._jittered(delay)
+
+    def run(self) -> bool:
+        """Produz e publica os dados; devolve se deu certo"""
+        started = time.time()
+        try:
+            data = self.produce()
+            if isinstance(data, dict) and data.get("success") is False:
+                raise RuntimeError(data.get("error") or "coleta sem sucesso")
+            self.store.publish(data)
+            self.last_success = time.time()
+            self.last_error = None
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Erro ao atualizar {self.name}: {e}")
+            return False
+        finally:
+            self.last_duration = time.time() - started
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "interval_s": self.interval,
+            "failures": self.failures,
+            "last_success": self.last_success,
+            "last_error": self.last_error,
+            "last_duration_s": round(self.last_duration, 2) if self.last_duration is not None else None,
+            "next_run_in_s": round(max(0.0, self.next_run - time.time()), 1),
+        }
+
+
+class RefreshScheduler:
+    def __init__(self, jobs: Iterable[RefreshJob], tick: float = 30.0):
+        self.jobs: Dict[str, RefreshJob] = {job.name: job for job in jobs}
+        self.tick = tick
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Um worker por conjunto: uma coleta lenta não atrasa as demais
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(self.jobs)), thread_name_prefix="refresh")
+
+    def start(self):
+        """Inicia a thread do agendador (uma única vez)"""
+        if self._thread is not None:
+            return
+        now = time.time()
+        for job in self.jobs.values():
+            job.schedule_initial(now)
+        self._thread = threading.Thread(target=self._loop, name="refresh-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def run_now(self, name: str) -> bool:
+        """Antecipa a atualização de um conjunto; ignora se ele já estiver rodando"""
+        job = self.jobs.get(name)
+        if job is None:
+            raise KeyError(name)
+        with self._lock:
+            if job.running:
+                return False
+            job.next_run = 0.0
+        self._wakeup.set()
+        return True
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: job.status() for name, job in self.jobs.items()}
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            now = time.time()
+            with self._lock:
+                due: List[RefreshJob] = [job for job in self.jobs.values() if not job.running and job.next_run <= now]
+                for job in due:
+                    job.running = True
+                pending = [job.next_run for job in self.jobs.values() if not job.running]
+
+            for job in due:
+                self._executor.submit(self._run_job, job)
+
+            wait = min([self.tick] + [max(0.0, t - now) for t in pending])
+            self._wakeup.wait(wait)
+            self._wakeup.clear()
+
+    def _run_job(self, job: RefreshJob):
+        print(f"🔄 Atualizando {job.name}...")
+        succeeded = job.run()
+        with self._lock:
+            job.running = False
+            job.schedule_next(time.time(), succeeded)
+        if succeeded:
+            print(f"✅ {job.name} atualizado em {job.last_duration:.1f}s")
+        else:
+            print(f"⚠️  Falha ao atualizar {job.name} ({job.failures}ª seguida); nova tentativa em {job.next_run - time.time():.0f}s")
+        self._wakeup.set()
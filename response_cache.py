@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Response Cache - Cache em disco das respostas das APIs governamentais
+Guarda as respostas em SQLite (chave: URL + parâmetros) com TTL por endpoint,
+revalidação por ETag/Last-Modified e entrega de dados vencidos enquanto atualiza
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlencode
+
+from http_session import get_session
+from serialization import loads
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.environ.get(
+    "FETCHER_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "http_cache.sqlite3")
+)
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# TTL (fresco, vencido aceitável) por prefixo de URL; o prefixo mais longo vence
+DEFAULT_TTLS = {
+    "https://servicodados.ibge.gov.br/api/v1/projecoes/populacao": (DAY, 30 * DAY),
+    "https://servicodados.ibge.gov.br/api/v1/agregados": (30 * DAY, 365 * DAY),
+    "https://servicodados.ibge.gov.br/api/v1/localidades": (30 * DAY, 365 * DAY),
+    "https://apidatalake.tesouro.gov.br/ords/siconfi": (7 * DAY, 365 * DAY),
+}
+FALLBACK_TTL = (HOUR, DAY)
+
+# Espelho em memória das respostas mais usadas (LRU), limitado em bytes; o resto fica só no SQLite
+DEFAULT_MEMORY_BYTES = int(os.environ.get("FETCHER_CACHE_MEMORY_BYTES", 32 * 1024 * 1024))
+
+
+class CachedResponse:
+    """Resposta mínima compatível com requests.Response (status_code, content, json())"""
+
+    def __init__(self, status_code: int, content: bytes, headers: Dict[str, str] = None,
+                 from_cache: bool = False, stale: bool = False):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.from_cache = from_cache
+        self.stale = stale
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return loads(self.content)
+
+
+class ResponseCache:
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, getter: Callable[..., Any] = None,
+                 ttls: Dict[str, tuple] = None, memory_bytes: int = DEFAULT_MEMORY_BYTES):
+        self.path = path
+        self.getter = getter or get_session().get
+        self.ttls = ttls if ttls is not None else DEFAULT_TTLS
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._memory_bytes = 0
+        self._memory_limit = memory_bytes
+        self._memory_lock = threading.Lock()
+        self._revalidating = set()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL
+            )"""
+        )
+        self._db.commit()
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """Chave estável do cache a partir da URL e dos parâmetros"""
+        if not params:
+            return url
+        return f"{url}?{urlencode(sorted(params.items()))}"
+
+    def ttl_for(self, url: str) -> tuple:
+        """TTL (fresco, vencido) configurado para o endpoint"""
+        best = None
+        for prefix in self.ttls:
+            if url.startswith(prefix) and (best is None or len(prefix) > len(best)):
+                best = prefix
+        return self.ttls[best] if best else FALLBACK_TTL
+
+    def _remember(self, key: str, entry: tuple):
+        """Guarda no espelho em memória, descartando as respostas usadas há mais tempo"""
+        size = len(entry[0])
+        with self._memory_lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old[0])
+            # Respostas maiores que um quarto do limite (ex.: séries do RREO) ficam só no disco
+            if size > self._memory_limit // 4:
+                return
+            self._memory[key] = entry
+            self._memory_bytes += size
+            while self._memory_bytes > self._memory_limit:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted[0])
+
+    def _load(self, key: str) -> Optional[tuple]:
+        with self._memory_lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is not None:
+            entry = (bytes(row[0]), row[1], row[2], row[3])
+            self._remember(key, entry)
+        return entry
+
+    def _store(self, key: str, body: bytes, etag: Optional[str], last_modified: Optional[str]):
+        entry = (body, etag, last_modified, time.time())
+        self._remember(key, entry)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, body, etag, last_modified, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, *entry),
+            )
+            self._db.commit()
+
+    def _touch(self, key: str, entry: tuple):
+        self._store(key, entry[0], entry[1], entry[2])
+
+    def _fetch(self, key: str, url: str, entry: Optional[tuple], rate_limiter=None,
+               **kwargs) -> CachedResponse:
+        """Faz a requisição (condicional, se houver cópia) e atualiza o cache"""
+        headers = dict(kwargs.pop("headers", None) or {})
+        if entry is not None:
+            if entry[1]:
+                headers["If-None-Match"] = entry[1]
+            if entry[2]:
+                headers["If-Modified-Since"] = entry[2]
+
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        response = self.getter(url, headers=headers, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            self._touch(key, entry)
+            return CachedResponse(200, entry[0], from_cache=True)
+
+        if response.status_code == 200:
+            self._store(key, response.content, response.headers.get("ETag"),
+                        response.headers.get("Last-Modified"))
+            return CachedResponse(200, response.content, dict(response.headers))
+
+        return CachedResponse(response.status_code, response.content, dict(response.headers))
+
+    def _revalidate_in_background(self, key: str, url: str, entry: tuple, kwargs: Dict[str, Any]):
+        with self._lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+
+        def run():
+            try:
+                self._fetch(key, url, entry, **kwargs)
+            except Exception as e:
+                logger.warning(f"Falha ao revalidar {url}: {e}")
+            finally:
+                with self._lock:
+                    self._revalidating.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, ttl: Optional[float] = None,
+            stale_ttl: Optional[float] = None, rate_limiter=None, **kwargs) -> CachedResponse:
+        """GET com cache: fresco → local; vencido aceitável → local + revalidação; senão → rede
+
+        O `rate_limiter` (ex.: TokenBucket) só é consumido quando a rede é acessada.
+        """
+        default_ttl, default_stale = self.ttl_for(url)
+        ttl = default_ttl if ttl is None else ttl
+        stale_ttl = default_stale if stale_ttl is None else stale_ttl
+
+        key = self.make_key(url, params)
+        if params:
+            kwargs["params"] = params
+        kwargs["rate_limiter"] = rate_limiter
+
+        entry = self._load(key)
+        if entry is not None:
+            age = time.time() - entry[3]
+            if age < ttl:
+                return CachedResponse(200, entry[0], from_cache=True)
+            if age < ttl + stale_ttl:
+                self._revalidate_in_background(key, url, entry, dict(kwargs))
+                return CachedResponse(200, entry[0], from_cache=True, stale=True)
+
+        try:
+            response = self._fetch(key, url, entry, **kwargs)
+        except Exception:
+            # Fonte fora do ar: qualquer cópia local é melhor que nenhuma
+            if entry is not None:
+                return CachedResponse(200, entry[0], from_cache=True, stale=True)
+            raise
+
+        if response.status_code >= 500 and entry is not None:
+            return CachedResponse(200, entry[0], from_cache=True, stale=True)
+        return response
+
+    def clear(self):
+        """Remove todas as respostas guardadas"""
+        with self._memory_lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> ResponseCache:
+    """Cache compartilhado por todos os fetchers do processo"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
+
+
+def cached_get(url: str, **kwargs) -> CachedResponse:
+    """Atalho para ResponseCache.get usando o cache compartilhado"""
+    return get_default_cache().get(url, **kwargs)
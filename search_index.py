@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Search Index - Índice invertido incremental do acervo de artigos do PEGN
+Tokenização para o português (sem acentos, sem stopwords, plurais reduzidos),
+ranking BM25 e filtros por tag e categoria; persistido em SQLite ao lado do acervo
+"""
+
+import math
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from article_store import DEFAULT_STORE_PATH
+from records import Article
+
+DEFAULT_INDEX_PATH = os.environ.get(
+    "PEGN_INDEX_PATH",
+    os.path.join(os.path.dirname(DEFAULT_STORE_PATH), "pegn_search.sqlite3")
+)
+
+# Parâmetros usuais do BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Termos do título contam como se aparecessem TITLE_WEIGHT vezes
+TITLE_WEIGHT = 3
+
+STOPWORDS = frozenset("""
+a ao aos aquela aquelas aquele aqueles aquilo as ate com como da das de dela delas dele deles depois
+do dos e ela elas ele eles em entre era eram essa essas esse esses esta estas este estes eu foi foram
+ha isso isto ja lhe lhes mais mas me mesmo meu minha muito na nas nem no nos nossa nosso num numa o
+os ou para pela pelas pelo pelos por qual quando que quem se sem ser seu seus sua suas tambem te tem
+ter um uma umas uns voce vai sao esta estao foi sobre apos ainda tudo todo toda todos todas cada
+""".split())
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Reduções de plural (sobre o texto já sem acentos), da mais específica para a mais geral
+_PLURAL_RULES = (
+    ("oes", "ao"), ("aes", "ao"), ("ais", "al"), ("eis", "el"), ("ois", "ol"),
+    ("ns", "m"), ("res", "r"), ("zes", "z"), ("ses", "s"),
+)
+
+
+def fold_accents(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def stem(token: str) -> str:
+    """Reduz plurais comuns do português ("inovacoes" -> "inovacao", "empresas" -> "empresa")"""
+    if len(token) <= 3:
+        return token
+    for suffix, replacement in _PLURAL_RULES:
+        if token.endswith(suffix):
+            return token[:-len(suffix)] + replacement
+    if token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Termos indexáveis do texto"""
+    return [
+        stem(token) for token in _TOKEN_PATTERN.findall(fold_accents(text))
+        if token not in STOPWORDS and len(token) > 1
+    ]
+
+
+def normalize_label(label: str) -> str:
+    """Forma canônica de tags e categorias para filtro"""
+    return " ".join(fold_accents(label).split())
+
+
+class ArticleSearchIndex:
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS docs (
+                doc_id INTEGER PRIMARY KEY,
+                url TEXT UNIQUE NOT NULL,
+                length INTEGER NOT NULL,
+                category TEXT,
+                date TEXT
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                doc_id INTEGER NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (term, doc_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);
+            CREATE TABLE IF NOT EXISTS doc_tags (
+                doc_id INTEGER NOT NULL,
+                tag TEXT NOT NULL,
+                PRIMARY KEY (tag, doc_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS doc_tags_doc ON doc_tags (doc_id);
+            CREATE INDEX IF NOT EXISTS docs_date ON docs (date);
+            """
+        )
+        self._db.commit()
+        self._load_stats()
+
+    def _load_stats(self):
+        self._data_version = self._db.execute("PRAGMA data_version").fetchone()[0]
+        count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs").fetchone()
+        self._doc_count = count
+        self._total_length = total
+
+    def _refresh_stats(self):
+        # Chamado com o lock adquirido; data_version muda quando outra conexão grava no banco
+        # (ex.: o backfill indexando enquanto o serviço responde buscas); as gravações desta
+        # conexão já atualizam os totais em memória
+        if self._db.execute("PRAGMA data_version").fetchone()[0] != self._data_version:
+            self._load_stats()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh_stats()
+            return self._doc_count
+
+    def __contains__(self, url: str) -> bool:
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM docs WHERE url = ?", (url,)).fetchone() is not None
+
+    def _remove(self, url: str):
+        # Chamado com o lock adquirido
+        row = self._db.execute("SELECT doc_id, length FROM docs WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return
+        doc_id, length = row
+        self._db.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+        self._db.execute("DELETE FROM doc_tags WHERE doc_id = ?", (doc_id,))
+        self._db.execute("DELETE FROM docs WHERE doc_id = ?", (doc_id,))
+        self._doc_count -= 1
+        self._total_length -= length
+
+    def _add(self, article: Article):
+        # Chamado com o lock adquirido; o commit fica com quem chamou
+        terms = Counter(tokenize(article.content))
+        for term in tokenize(article.title):
+            terms[term] += TITLE_WEIGHT
+        length = sum(terms.values())
+
+        self._remove(article.url)
+        doc_id = self._db.execute(
+            "INSERT INTO docs (url, length, category, date) VALUES (?, ?, ?, ?)",
+            (article.url, length, normalize_label(article.category), article.date),
+        ).lastrowid
+        self._db.executemany(
+            "INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)",
+            [(term, doc_id, tf) for term, tf in terms.items()],
+        )
+        self._db.executemany(
+            "INSERT OR IGNORE INTO doc_tags (doc_id, tag) VALUES (?, ?)",
+            [(doc_id, normalize_label(tag)) for tag in article.tags],
+        )
+        self._doc_count += 1
+        self._total_length += length
+
+    def add(self, article: Article):
+        """Indexa (ou reindexa) um artigo"""
+        with self._lock:
+            self._refresh_stats()
+            self._add(article)
+            self._db.commit()
+
+    def add_many(self, articles: Iterable[Article]) -> int:
+        """Indexa vários artigos em uma única transação"""
+        count = 0
+        with self._lock:
+            self._refresh_stats()
+            for article in articles:
+                self._add(article)
+                count += 1
+            self._db.commit()
+        return count
+
+    def remove(self, url: str):
+        with self._lock:
+            self._refresh_stats()
+            self._remove(url)
+            self._db.commit()
+
+    def _filtered_docs(self, tags: Optional[Iterable[str]], category: Optional[str]) -> Optional[set]:
+        """Documentos que passam nos filtros (None = sem filtro)"""
+        allowed = None
+        for tag in tags or ():
+            docs = {row[0] for row in self._db.execute(
+                "SELECT doc_id FROM doc_tags WHERE tag = ?", (normalize_label(tag),)
+            )}
+            allowed = docs if allowed is None else allowed & docs
+        if category:
+            docs = {row[0] for row in self._db.execute(
+                "SELECT doc_id FROM docs WHERE category = ?", (normalize_label(category),)
+            )}
+            allowed = docs if allowed is None else allowed & docs
+        return allowed
+
+    def search(self, query: str = "", tags: Optional[Iterable[str]] = None, category: Optional[str] = None,
+               limit: int = 20) -> List[Tuple[str, float]]:
+        """(url, pontuação BM25) dos melhores artigos; sem consulta, os mais recentes que passam nos filtros"""
+        terms = set(tokenize(query))
+        with self._lock:
+            allowed = self._filtered_docs(tags, category)
+            if allowed is not None and not allowed:
+                return []
+
+            if not terms:
+                # Pelo índice de data: lê só até completar `limit` documentos que passam nos filtros
+                if allowed is None:
+                    rows = self._db.execute("SELECT url FROM docs ORDER BY date DESC LIMIT ?", (limit,))
+                    return [(url, 0.0) for (url,) in rows]
+                results = []
+                for doc_id, url in self._db.execute("SELECT doc_id, url FROM docs ORDER BY date DESC"):
+                    if doc_id in allowed:
+                        results.append((url, 0.0))
+                        if len(results) >= limit:
+                            break
+                return results
+
+            self._refresh_stats()
+            n = self._doc_count
+            avgdl = self._total_length / n if n else 0.0
+            scores: Dict[int, float] = {}
+            for term in terms:
+                postings = self._db.execute(
+                    "SELECT p.doc_id, p.tf, d.length FROM postings p JOIN docs d ON d.doc_id = p.doc_id "
+                    "WHERE p.term = ?",
+                    (term,),
+                ).fetchall()
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf, length in postings:
+                    if allowed is not None and doc_id not in allowed:
+                        continue
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avgdl) if avgdl else BM25_K1
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+            best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+            urls = dict(self._db.execute(
+                f"SELECT doc_id, url FROM docs WHERE doc_id IN ({','.join('?' * len(best))})",
+                [doc_id for doc_id, _ in best],
+            ).fetchall()) if best else {}
+        return [(urls[doc_id], score) for doc_id, score in best]
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Serialization - Serialização JSON rápida e saída binária opcional
+Usa orjson quando instalado (JSON compacto da biblioteca padrão caso contrário);
+indentação só quando pedida. msgpack, se instalado, serve o canal binário do serviço
+"""
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - depende do ambiente
+    msgpack = None
+
+JSON_CONTENT_TYPE = "application/json; charset=utf-8"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+
+MSGPACK_AVAILABLE = msgpack is not None
+
+
+def _default(value: Any) -> Any:
+    """Tipos que não são JSON nativo: registros (records.py), conjuntos e arrays"""
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+
+def dumps_bytes(data: Any, pretty: bool = False) -> bytes:
+    """JSON em UTF-8; compacto, a menos que `pretty` seja verdadeiro"""
+    if orjson is not None:
+        option = orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_default, option=option)
+    return dumps(data, pretty).encode("utf-8")
+
+
+def dumps(data: Any, pretty: bool = False) -> str:
+    """JSON como texto (sem escapar acentos); compacto, a menos que `pretty` seja verdadeiro"""
+    if orjson is not None:
+        return dumps_bytes(data, pretty).decode("utf-8")
+    if pretty:
+        return json.dumps(data, ensure_ascii=False, indent=2, default=_default)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=_default)
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def packb(data: Any) -> bytes:
+    """Codifica em msgpack (requer o pacote msgpack)"""
+    if msgpack is None:
+        raise RuntimeError("msgpack não está instalado")
+    return msgpack.packb(data, default=_default, use_bin_type=True)
+
+
+def unpackb(data: bytes) -> Any:
+    if msgpack is None:
+        raise RuntimeError("msgpack não está instalado")
+    return msgpack.unpackb(data, raw=False)
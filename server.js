@@ -4,6 +4,8 @@ const multer = require('multer');
 const path = require('path');
 const fs = require('fs');
 const cors = require('cors');
+const { callFetcherService } = require('./fetcher-service-client');
+const { readSnapshot } = require('./snapshot-reader');
 
 const app = express();
 const port = 3000;
@@ -398,6 +400,38 @@ app.post('/api/fetch-pegn-news', async (req, res) => {
     try {
         console.log('🔍 Buscando notícias de empreendedorismo...');
         
+        // Acervo pré-calculado pelo Fetcher Service em segundo plano (a cada 15 min)
+        try {
+            const news = readSnapshot('pegn_news').slice(0, 15);
+            return res.json({
+                success: true,
+                news: news,
+                count: news.length,
+                timestamp: new Date().toISOString()
+            });
+        } catch (snapshotError) {
+            console.log('📁 Snapshot de notícias ainda não publicado, buscando ao vivo');
+        }
+        
+        // Buscar pelo Fetcher Service, que mantém o scraper carregado
+        try {
+            const news = await callFetcherService('pegn.fetch_latest_news', { max_articles: 15 }, 60000);
+            
+            console.log(`✅ ${news.length} notícias encontradas`);
+            return res.json({
+                success: true,
+                news: news,
+                count: news.length,
+                timestamp: new Date().toISOString()
+            });
+        } catch (serviceError) {
+            if (!serviceError.serviceUnavailable) {
+                console.error('Erro no Fetcher Service:', serviceError.message);
+                return res.status(500).json({ error: 'Erro ao processar notícias', news: [] });
+            }
+            console.log('⚠️ Fetcher Service indisponível, executando pegn_scraper.py');
+        }
+        
         // Executar script Python para buscar notícias
         const { exec } = require('child_process');
         const path = require('path');
@@ -412,11 +446,9 @@ app.post('/api/fetch-pegn-news', async (req, res) => {
                 console.warn('Warnings do scraper:', stderr);
             }
             
-            // Tentar carregar arquivo JSON gerado
-            const fs = require('fs');
+            // Tentar carregar arquivo JSON gerado (ou o último snapshot válido)
             try {
-                const newsData = fs.readFileSync('pegn_news.json', 'utf8');
-                const news = JSON.parse(newsData);
+                const news = readSnapshot('pegn_news');
                 
                 console.log(`✅ ${news.length} notícias encontradas`);
                 res.json({
@@ -440,3 +472,41 @@ app.post('/api/fetch-pegn-news', async (req, res) => {
         res.status(500).json({ error: 'Erro interno do servidor' });
     }
 });
+
+// Busca no acervo de notícias (índice BM25 do Fetcher Service)
+app.get('/api/pegn-search', async (req, res) => {
+    const query = (req.query.q || '').toString();
+    const tags = [].concat(req.query.tag || []);
+    const category = req.query.category || null;
+    const limit = Math.min(parseInt(req.query.limit || '20', 10) || 20, 100);
+    
+    try {
+        const results = await callFetcherService('pegn.search_articles', {
+            query, tags, category, limit
+        }, 5000);
+        return res.json({ success: true, query, results, count: results.length });
+    } catch (serviceError) {
+        if (!serviceError.serviceUnavailable) {
+            console.error('Erro na busca de notícias:', serviceError.message);
+            return res.status(500).json({ success: false, error: 'Erro na busca', results: [] });
+        }
+        console.log('⚠️ Fetcher Service indisponível, buscando no arquivo de notícias');
+    }
+    
+    // Sem o serviço: varredura simples do último acervo publicado
+    try {
+        const fold = (text) => (text || '').normalize('NFD').replace(/[\u0300-\u036f]/g, '').toLowerCase();
+        const terms = fold(query).split(/\s+/).filter(Boolean);
+        const wantedTags = tags.map(fold);
+        const results = readSnapshot('pegn_news').filter((article) => {
+            const text = fold(`${article.title} ${article.content}`);
+            const articleTags = (article.tags || []).map(fold);
+            return terms.every((term) => text.includes(term))
+                && wantedTags.every((tag) => articleTags.includes(tag))
+                && (!category || fold(article.category) === fold(category));
+        }).slice(0, limit);
+        res.json({ success: true, query, results, count: results.length });
+    } catch (error) {
+        res.status(500).json({ success: false, error: 'Acervo de notícias indisponível', results: [] });
+    }
+});
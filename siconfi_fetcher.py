@@ -4,27 +4,98 @@ SICONFI Data Fetcher - Tesouro Nacional API
 Busca dados reais de gastos municipais em saúde e educação
 """
 
+import argparse
 import requests
-import json
-from typing import Dict, List, Any
+from array import array
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Sequence, Tuple
+
+from functional_classification import CLASSIFICATION_VERSION, FUNCTIONAL_ANNEX, aggregate_functions
+from fetch_pool import fetch_concurrently, get_rate_limiter, iter_concurrently
+from municipality_registry import resolve_municipalities
+from ndjson_output import write_ndjson
+from records import MunicipalIndicator
+from response_cache import cached_get
+from serialization import dumps
+from siconfi_series_store import SiconfiSeriesStore
+
+# O RREO é bimestral; o 6º período acumula o exercício inteiro
+RREO_PERIODS = (1, 2, 3, 4, 5, 6)
+ANNUAL_PERIOD = 6
+
+# Funções de governo (classificação funcional) das séries de saúde e educação
+HEALTH_EDUCATION_FUNCTIONS = {"saude": "10", "educacao": "12"}
+
+_VALUE_TRANSLATION = str.maketrans({".": None, ",": "."})
+
+
+def _parse_value(raw: Any) -> float:
+    if isinstance(raw, (int, float)):
+        return float(raw)
+    clean_value = str(raw).replace("R$", "").translate(_VALUE_TRANSLATION).strip()
+    try:
+        return float(clean_value) if clean_value else 0.0
+    except ValueError:
+        return 0.0
+
+
+def parse_values(raw_values: Iterable[Any]) -> array:
+    """Converte valores do RREO ("R$ 1.234,56", números) em um array de doubles; inválidos viram 0.0"""
+    raw_values = list(raw_values)
+    try:
+        # Caso comum: a API devolve números e o array converte a lista inteira de uma vez
+        return array("d", raw_values)
+    except TypeError:
+        # Há textos (ou None) na lista: conversão item a item
+        return array("d", map(_parse_value, raw_values))
+
+
+def health_education_totals(breakdown: Dict[str, Dict[str, Any]]) -> Dict[str, float]:
+    """Totais de saúde e educação a partir da classificação funcional (empenhado no Anexo 2)"""
+    return {
+        name: (breakdown.get(funcao) or {}).get("total", 0.0)
+        for name, funcao in HEALTH_EDUCATION_FUNCTIONS.items()
+    }
+
+
+def raw_value(item: Dict[str, Any]) -> Any:
+    """Valor bruto de uma linha do RREO: o campo da API é "valor" ("valor_empenhado" em formatos antigos)"""
+    value = item.get("valor")
+    return value if value is not None else item.get("valor_empenhado", "0")
+
+
+def item_columns(items: List[Dict[str, Any]]) -> Tuple[List[str], array]:
+    """Colunas (conta, valor) dos itens do RREO, com os valores convertidos em lote"""
+    contas = [item.get("conta") or "" for item in items]
+    valores = parse_values([raw_value(item) for item in items])
+    return contas, valores
 
 class SiconfiDataFetcher:
-    def __init__(self):
+    def __init__(self, municipalities: Optional[Iterable[str]] = None, max_workers: int = 6, deadline: float = 12.0,
+                 series_store: Optional[SiconfiSeriesStore] = None, requests_per_second: float = 4.0):
         self.base_url = "https://apidatalake.tesouro.gov.br/ords/siconfi/tt/rreo"
-        self.municipalities = {
-            "Monte Santo": "2921400",
-            "Cansanção": "2906107", 
-            "Uauá": "2932401",
-            "Quijingue": "2925807",
-            "Euclides da Cunha": "2910702",
-            "Senhor do Bonfim": "2930108"
-        }
+        # {nome: código IBGE} resolvido pelo cadastro compartilhado de municípios
+        self.municipalities = resolve_municipalities(municipalities)
+        # Requisições simultâneas ao Tesouro e prazo total (abaixo dos 15s do Node)
+        self.max_workers = max_workers
+        self.deadline = deadline
+        # Séries históricas guardadas localmente (aberto só quando usado)
+        self._series_store = series_store
+        self.requests_per_second = requests_per_second
+    
+    @property
+    def series_store(self) -> SiconfiSeriesStore:
+        if self._series_store is None:
+            self._series_store = SiconfiSeriesStore()
+        return self._series_store
         
-    def fetch_municipal_data(self, municipio_codigo: str, ano: int = 2023) -> Dict[str, Any]:
+    def fetch_municipal_data(self, municipio_codigo: str, ano: int = 2023, periodo: Optional[int] = None,
+                             rate_limiter=None) -> Dict[str, Any]:
         """Busca dados do RREO para um município específico"""
         try:
             url = f"{self.base_url}?municipio={municipio_codigo}&ano={ano}&tipo=RREO&fase=1"
-            response = requests.get(url, timeout=10)
+            if periodo is not None:
+                url += f"&periodo={periodo}"
+            response = cached_get(url, timeout=10, rate_limiter=rate_limiter)
             
             if response.status_code == 200:
                 data = response.json()
@@ -40,28 +111,28 @@ class SiconfiDataFetcher:
             print(f"❌ Erro para município {municipio_codigo}: {str(e)}")
             return {"success": False, "error": str(e)}
     
+    def fetch_all_municipal_data(self, ano: int = 2023) -> Dict[str, Dict[str, Any]]:
+        """Busca o RREO de todos os municípios em paralelo, respeitando o prazo total"""
+        calls = {
+            nome: (lambda codigo=codigo: self.fetch_municipal_data(codigo, ano))
+            for nome, codigo in self.municipalities.items()
+        }
+        results = fetch_concurrently(calls, max_workers=self.max_workers, deadline=self.deadline)
+        
+        for nome, result in results.items():
+            if not result.get("success"):
+                print(f"⚠️  {nome}: {result.get('error')}")
+        
+        return results
+    
     def extract_health_education_values(self, data: Dict) -> Dict[str, float]:
         """Extrai valores de saúde e educação dos dados RREO"""
         try:
             if not data.get("success") or not data.get("data", {}).get("items"):
                 return {"saude": 0.0, "educacao": 0.0}
             
-            items = data["data"]["items"]
-            saude_total = 0.0
-            educacao_total = 0.0
-            
-            for item in items:
-                # Procurar por indicadores de saúde
-                if any(keyword in item.get("conta", "").lower() for keyword in ["saude", "saúde", "sus"]):
-                    valor = self.parse_value(item.get("valor_empenhado", "0"))
-                    saude_total += valor
-                
-                # Procurar por indicadores de educação
-                if any(keyword in item.get("conta", "").lower() for keyword in ["educacao", "educação", "ensino"]):
-                    valor = self.parse_value(item.get("valor_empenhado", "0"))
-                    educacao_total += valor
-            
-            return {"saude": saude_total, "educacao": educacao_total}
+            # Mesmo caminho da classificação funcional: Anexo 2, coluna do empenhado
+            return health_education_totals(self.extract_functional_breakdown(data))
             
         except Exception as e:
             print(f"❌ Erro ao extrair valores: {str(e)}")
@@ -69,64 +140,188 @@ class SiconfiDataFetcher:
     
     def parse_value(self, value_str: str) -> float:
         """Converte string de valor para float"""
-        try:
-            if isinstance(value_str, (int, float)):
-                return float(value_str)
-            
-            # Remove formatação comum
-            clean_value = str(value_str).replace("R$", "").replace(".", "").replace(",", ".").strip()
-            return float(clean_value) if clean_value else 0.0
-        except:
-            return 0.0
+        return _parse_value(value_str)
     
-    def generate_municipal_comparison(self) -> Dict[str, Any]:
-        """Gera comparação entre municípios com dados reais"""
-        print("🔍 Buscando dados do SICONFI (Tesouro Nacional)...")
-        
-        results = []
+    def iter_municipal_indicators(self, ano: int = 2023) -> Iterator[MunicipalIndicator]:
+        """Gera o registro de cada município (sem ranking) assim que os dados dele chegam"""
+        calls = {
+            nome: (lambda codigo=codigo: self.fetch_municipal_data(codigo, ano))
+            for nome, codigo in self.municipalities.items()
+        }
         
-        for nome, codigo in self.municipalities.items():
+        for nome, municipal_data in iter_concurrently(calls, max_workers=self.max_workers, deadline=self.deadline):
+            codigo = self.municipalities[nome]
             print(f"📊 Processando {nome} ({codigo})...")
+            if not municipal_data.get("success"):
+                print(f"⚠️  {nome}: {municipal_data.get('error')}")
             
-            # Buscar dados do município
-            municipal_data = self.fetch_municipal_data(codigo)
             values = self.extract_health_education_values(municipal_data)
             
             # Usar dados estimados se API falhar (baseados em dados reais históricos)
             if values["saude"] == 0.0 and values["educacao"] == 0.0:
                 values = self.get_estimated_values(nome)
             
-            results.append({
-                "municipio": nome,
-                "codigo": codigo,
-                "saude": values["saude"],
-                "educacao": values["educacao"],
-                "total": values["saude"] + values["educacao"]
-            })
+            yield MunicipalIndicator(
+                municipio=nome,
+                codigo=codigo,
+                saude=values["saude"],
+                educacao=values["educacao"],
+                total=values["saude"] + values["educacao"]
+            )
+    
+    def iter_municipal_records(self, ano: int = 2023) -> Iterator[Dict[str, Any]]:
+        """Versão em dicionários de iter_municipal_indicators (saída NDJSON)"""
+        for record in self.iter_municipal_indicators(ano):
+            yield record.to_dict()
+    
+    def generate_municipal_comparison(self) -> Dict[str, Any]:
+        """Gera comparação entre municípios com dados reais"""
+        print("🔍 Buscando dados do SICONFI (Tesouro Nacional)...")
+        
+        # Buscar dados de todos os municípios de uma vez
+        results = list(self.iter_municipal_indicators())
         
         # Classificar por investimento total
-        results.sort(key=lambda x: x["total"], reverse=True)
+        results.sort(key=lambda x: x.total, reverse=True)
         
         # Adicionar rankings de cor
         for i, result in enumerate(results):
             if i == 0:  # Maior investimento
-                result["status"] = "good"
-                result["rank_color"] = "#059669"
+                result.status = "good"
+                result.rank_color = "#059669"
             elif i >= len(results) - 2:  # Menores investimentos
-                result["status"] = "alert" 
-                result["rank_color"] = "#dc2626"
+                result.status = "alert" 
+                result.rank_color = "#dc2626"
             else:  # Investimentos médios
-                result["status"] = "warning"
-                result["rank_color"] = "#d97706"
+                result.status = "warning"
+                result.rank_color = "#d97706"
         
         print("✅ Dados municipais processados com sucesso!")
         return {
             "success": True,
-            "data": results,
+            "data": [result.to_dict() for result in results],
             "source": "SICONFI - Tesouro Nacional",
             "year": 2023
         }
     
+    def fetch_historical_data(self, anos: Sequence[int], periodos: Sequence[int] = (ANNUAL_PERIOD,),
+                              refresh: bool = False) -> Dict[str, Any]:
+        """Baixa o RREO de vários anos e períodos para todos os municípios e guarda no armazenamento local
+        
+        Demonstrativos já guardados não são buscados de novo, a menos que `refresh` seja verdadeiro.
+        """
+        store = self.series_store
+        rate_limiter = get_rate_limiter("siconfi", self.requests_per_second)
+        
+        calls = {}
+        for nome, codigo in self.municipalities.items():
+            for ano in anos:
+                for periodo in periodos:
+                    if refresh or not store.has(codigo, ano, periodo):
+                        calls[(codigo, ano, periodo)] = (
+                            lambda codigo=codigo, ano=ano, periodo=periodo:
+                                self.fetch_municipal_data(codigo, ano, periodo, rate_limiter=rate_limiter)
+                        )
+        
+        print(f"📥 {len(calls)} demonstrativos a baixar do SICONFI")
+        stored, errors = 0, {}
+        for (codigo, ano, periodo), result in iter_concurrently(calls, max_workers=self.max_workers):
+            items = (result.get("data") or {}).get("items") if result.get("success") else None
+            if not items:
+                # Lista vazia: demonstrativo ainda não entregue; não é guardado para ser buscado de novo
+                errors[f"{codigo}/{ano}/{periodo}"] = result.get("error", "Demonstrativo sem itens")
+                continue
+            contas, valores = item_columns(items)
+            colunas = [item.get("coluna") or "" for item in items]
+            anexos = [item.get("anexo") or "" for item in items]
+            store.save(codigo, ano, periodo, contas, colunas, valores, anexos)
+            stored += 1
+        
+        return {
+            "success": stored > 0 or not calls,
+            "requested": len(calls),
+            "stored": stored,
+            "errors": errors,
+        }
+    
+    def extract_functional_breakdown(self, data: Dict) -> Dict[str, Dict[str, Any]]:
+        """Totais de todas as funções e subfunções a partir da resposta da API"""
+        if not data.get("success") or not data.get("data", {}).get("items"):
+            return {}
+        items = [item for item in data["data"]["items"] if item.get("anexo") == FUNCTIONAL_ANNEX]
+        contas, valores = item_columns(items)
+        return aggregate_functions(contas, [item.get("coluna") or "" for item in items], valores)
+    
+    def functional_breakdown(self, codigo: str, ano: int, periodo: int = ANNUAL_PERIOD) -> Optional[Dict[str, Any]]:
+        """Classificação funcional de um demonstrativo guardado, calculada uma vez e guardada junto dele"""
+        store = self.series_store
+        breakdown = store.load_derived(codigo, ano, periodo, "funcoes", CLASSIFICATION_VERSION)
+        if breakdown is None:
+            columns = store.load_columns(codigo, ano, periodo, anexo=FUNCTIONAL_ANNEX)
+            if columns is None:
+                return None
+            breakdown = aggregate_functions(*columns)
+            store.save_derived(codigo, ano, periodo, "funcoes", CLASSIFICATION_VERSION, breakdown)
+        return breakdown
+    
+    def generate_functional_breakdown(self, ano: int = 2023, periodo: int = ANNUAL_PERIOD) -> Dict[str, Any]:
+        """Despesa por função e subfunção de todos os municípios"""
+        self.fetch_historical_data([ano], [periodo])
+        
+        data = []
+        for nome, codigo in self.municipalities.items():
+            breakdown = self.functional_breakdown(codigo, ano, periodo)
+            if breakdown is None:
+                print(f"⚠️  {nome}: demonstrativo {ano}/{periodo} indisponível")
+                continue
+            data.append({"municipio": nome, "codigo": codigo, "funcoes": breakdown})
+        
+        return {
+            "success": bool(data),
+            "data": data,
+            "source": "SICONFI - Tesouro Nacional (RREO Anexo 2)",
+            "year": ano,
+            "period": periodo
+        }
+    
+    def generate_time_series(self, anos: Sequence[int], periodo: int = ANNUAL_PERIOD,
+                             fetch_missing: bool = True) -> Dict[str, Any]:
+        """Série de saúde e educação por município e ano, calculada a partir do armazenamento local"""
+        if fetch_missing:
+            self.fetch_historical_data(anos, (periodo,))
+        
+        data = []
+        for nome, codigo in self.municipalities.items():
+            series = []
+            previous_total = None
+            for ano in sorted(anos):
+                # Mesmas linhas da classificação funcional: só o Anexo 2, coluna do empenhado
+                breakdown = self.functional_breakdown(codigo, ano, periodo)
+                if breakdown is None:
+                    continue
+                values = health_education_totals(breakdown)
+                total = values["saude"] + values["educacao"]
+                point = {
+                    "ano": ano,
+                    "periodo": periodo,
+                    "saude": values["saude"],
+                    "educacao": values["educacao"],
+                    "total": total,
+                    # Variação em relação ao ano anterior disponível
+                    "variacao_total": (total - previous_total) / previous_total if previous_total else None,
+                }
+                series.append(point)
+                previous_total = total
+            data.append({"municipio": nome, "codigo": codigo, "series": series})
+        
+        return {
+            "success": True,
+            "data": data,
+            "source": "SICONFI - Tesouro Nacional",
+            "years": sorted(anos),
+            "period": periodo
+        }
+    
     def get_estimated_values(self, municipio: str) -> Dict[str, float]:
         """Valores estimados baseados em dados históricos reais (fallback)"""
         estimates = {
@@ -139,7 +334,50 @@ class SiconfiDataFetcher:
         }
         return estimates.get(municipio, {"saude": 5000000.0, "educacao": 8000000.0})
 
-if __name__ == "__main__":
+def parse_range(text: str) -> List[int]:
+    """Converte "2019-2023" ou "2019,2021" em lista de inteiros"""
+    values = []
+    for part in text.split(","):
+        start, _, end = part.strip().partition("-")
+        values.extend(range(int(start), int(end or start) + 1))
+    return values
+
+def main():
+    """Função principal para executar o fetcher"""
+    parser = argparse.ArgumentParser(description="Busca gastos municipais no SICONFI")
+    parser.add_argument("--ndjson", metavar="ARQUIVO",
+                        help="grava cada município como uma linha JSON assim que chega (- para stdout)")
+    parser.add_argument("--anos", metavar="INICIO-FIM",
+                        help="modo histórico: baixa e guarda localmente o RREO dos anos informados (ex.: 2019-2023)")
+    parser.add_argument("--periodos", metavar="INICIO-FIM", default=str(ANNUAL_PERIOD),
+                        help="bimestres do RREO no modo histórico (padrão: 6, o exercício completo)")
+    parser.add_argument("--funcoes", type=int, metavar="ANO",
+                        help="despesa por função e subfunção (classificação funcional) do ano informado")
+    parser.add_argument("--pretty", action="store_true", help="JSON indentado (padrão: compacto)")
+    args = parser.parse_args()
+    
     fetcher = SiconfiDataFetcher()
+    
+    if args.funcoes:
+        result = fetcher.generate_functional_breakdown(args.funcoes, parse_range(args.periodos)[-1])
+        print(dumps(result, args.pretty))
+        return
+    
+    if args.anos:
+        anos = parse_range(args.anos)
+        periodos = parse_range(args.periodos)
+        summary = fetcher.fetch_historical_data(anos, periodos)
+        print(f"✅ {summary['stored']} de {summary['requested']} demonstrativos guardados")
+        result = fetcher.generate_time_series(anos, periodos[-1], fetch_missing=False)
+        print(dumps(result, args.pretty))
+        return
+    
+    if args.ndjson:
+        write_ndjson(fetcher.iter_municipal_records(), args.ndjson)
+        return
+    
     result = fetcher.generate_municipal_comparison()
-    print(json.dumps(result, indent=2, ensure_ascii=False))
\ No newline at end of file
+    print(dumps(result, args.pretty))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
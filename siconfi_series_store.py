@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+SICONFI Series Store - Armazenamento local colunar das séries históricas do RREO
+Cada demonstrativo (município, ano, período) vira um bloco de colunas compactas:
+contas, colunas e anexos codificados como inteiros de um dicionário compartilhado
+e valores em array de doubles, gravados como BLOB no SQLite
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from records import BudgetLine
+from serialization import dumps, loads
+
+# Versão do formato das linhas guardadas; ao abrir um banco mais antigo, os demonstrativos
+# são marcados para serem baixados de novo (2: valores lidos do campo "valor" da API)
+STORE_VERSION = 2
+
+DEFAULT_SERIES_PATH = os.environ.get(
+    "SICONFI_SERIES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "siconfi_series.sqlite3")
+)
+
+
+class SiconfiSeriesStore:
+    def __init__(self, path: str = DEFAULT_SERIES_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._label_ids: Dict[str, int] = {}
+        self._labels: Dict[int, str] = {}
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS labels (id INTEGER PRIMARY KEY, text TEXT UNIQUE NOT NULL)")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS rreo (
+                codigo TEXT NOT NULL,
+                ano INTEGER NOT NULL,
+                periodo INTEGER NOT NULL,
+                contas BLOB NOT NULL,
+                colunas BLOB NOT NULL,
+                valores BLOB NOT NULL,
+                fetched_at REAL NOT NULL,
+                anexos BLOB,
+                PRIMARY KEY (codigo, ano, periodo)
+            )"""
+        )
+        # Bancos criados antes da coluna de anexos: essas linhas ficam com NULL e são baixadas de novo
+        if "anexos" not in {row[1] for row in self._db.execute("PRAGMA table_info(rreo)")}:
+            self._db.execute("ALTER TABLE rreo ADD COLUMN anexos BLOB")
+        # Totais derivados (ex.: classificação funcional), guardados junto dos dados brutos
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS derived (
+                codigo TEXT NOT NULL,
+                ano INTEGER NOT NULL,
+                periodo INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (codigo, ano, periodo, kind)
+            )"""
+        )
+        if self._db.execute("PRAGMA user_version").fetchone()[0] < STORE_VERSION:
+            # Sem anexos, has() considera o demonstrativo ausente; os derivados são recalculados
+            self._db.execute("UPDATE rreo SET anexos = NULL")
+            self._db.execute("DELETE FROM derived")
+            self._db.execute(f"PRAGMA user_version = {STORE_VERSION}")
+        self._db.commit()
+
+        for label_id, text in self._db.execute("SELECT id, text FROM labels"):
+            self._label_ids[text] = label_id
+            self._labels[label_id] = text
+
+    def _label_id(self, text: str) -> int:
+        # Chamado com o lock adquirido; outro processo pode já ter gravado o mesmo texto
+        label_id = self._label_ids.get(text)
+        if label_id is None:
+            self._db.execute("INSERT OR IGNORE INTO labels (text) VALUES (?)", (text,))
+            label_id = self._db.execute("SELECT id FROM labels WHERE text = ?", (text,)).fetchone()[0]
+            self._label_ids[text] = label_id
+            self._labels[label_id] = text
+        return label_id
+
+    def _label_texts(self, ids) -> Dict[int, str]:
+        """Dicionário de rótulos contendo `ids`; rótulos gravados por outro processo (ex.: o CLI
+        com --anos enquanto o serviço roda) são carregados do banco na primeira vez que aparecem"""
+        missing = set(ids).difference(self._labels)
+        if missing:
+            with self._lock:
+                placeholders = ",".join("?" * len(missing))
+                for label_id, text in self._db.execute(
+                    f"SELECT id, text FROM labels WHERE id IN ({placeholders})", list(missing)
+                ):
+                    self._label_ids[text] = label_id
+                    self._labels[label_id] = text
+        return self._labels
+
+    def save(self, codigo: str, ano: int, periodo: int, contas: Sequence[str], colunas: Sequence[str],
+             valores: Sequence[float], anexos: Sequence[str]):
+        """Grava as colunas de um demonstrativo, substituindo a versão anterior"""
+        with self._lock:
+            conta_ids = array("I", [self._label_id(conta) for conta in contas])
+            coluna_ids = array("I", [self._label_id(coluna) for coluna in colunas])
+            anexo_ids = array("I", [self._label_id(anexo) for anexo in anexos])
+            self._db.execute(
+                "INSERT OR REPLACE INTO rreo (codigo, ano, periodo, contas, colunas, valores, fetched_at, anexos) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (str(codigo), ano, periodo, conta_ids.tobytes(), coluna_ids.tobytes(),
+                 array("d", valores).tobytes(), time.time(), anexo_ids.tobytes()),
+            )
+            # Dados novos invalidam os totais derivados do demonstrativo
+            self._db.execute(
+                "DELETE FROM derived WHERE codigo = ? AND ano = ? AND periodo = ?", (str(codigo), ano, periodo)
+            )
+            self._db.commit()
+
+    def load_derived(self, codigo: str, ano: int, periodo: int, kind: str, version: int) -> Optional[Any]:
+        """Resultado derivado guardado, se existir e tiver sido calculado com a mesma versão"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM derived WHERE codigo = ? AND ano = ? AND periodo = ? AND kind = ? AND version = ?",
+                (str(codigo), ano, periodo, kind, version),
+            ).fetchone()
+        return loads(row[0]) if row else None
+
+    def save_derived(self, codigo: str, ano: int, periodo: int, kind: str, version: int, data: Any):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO derived (codigo, ano, periodo, kind, version, data) VALUES (?, ?, ?, ?, ?, ?)",
+                (str(codigo), ano, periodo, kind, version, dumps(data)),
+            )
+            self._db.commit()
+
+    def load_columns(self, codigo: str, ano: int, periodo: int,
+                     anexo: Optional[str] = None) -> Optional[Tuple[List[str], List[str], array]]:
+        """Colunas (contas, colunas, valores) de um demonstrativo guardado; com `anexo`, só as linhas dele"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT contas, colunas, valores, anexos FROM rreo WHERE codigo = ? AND ano = ? AND periodo = ?",
+                (str(codigo), ano, periodo),
+            ).fetchone()
+        if row is None or (anexo is not None and row[3] is None):
+            return None
+        conta_ids, coluna_ids, valores = array("I"), array("I"), array("d")
+        conta_ids.frombytes(row[0])
+        coluna_ids.frombytes(row[1])
+        valores.frombytes(row[2])
+        if anexo is not None:
+            anexo_ids = array("I")
+            anexo_ids.frombytes(row[3])
+            anexo_labels = self._label_texts(set(anexo_ids))
+            keep = [i for i, anexo_id in enumerate(anexo_ids) if anexo_labels[anexo_id] == anexo]
+            conta_ids = array("I", [conta_ids[i] for i in keep])
+            coluna_ids = array("I", [coluna_ids[i] for i in keep])
+            valores = array("d", [valores[i] for i in keep])
+        labels = self._label_texts(set(conta_ids) | set(coluna_ids))
+        return [labels[i] for i in conta_ids], [labels[i] for i in coluna_ids], valores
+
+    def load(self, codigo: str, ano: int, periodo: int) -> Optional[List[BudgetLine]]:
+        """Linhas de um demonstrativo guardado (conta, coluna, valor_empenhado)"""
+        columns = self.load_columns(codigo, ano, periodo)
+        if columns is None:
+            return None
+        return [BudgetLine(conta, coluna, valor) for conta, coluna, valor in zip(*columns)]
+
+    def has(self, codigo: str, ano: int, periodo: int) -> bool:
+        """Se o demonstrativo está guardado (os gravados sem os anexos contam como ausentes)"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT 1 FROM rreo WHERE codigo = ? AND ano = ? AND periodo = ? AND anexos IS NOT NULL",
+                (str(codigo), ano, periodo),
+            ).fetchone() is not None
+
+    def available(self, codigo: Optional[str] = None) -> List[Tuple[str, int, int]]:
+        """Demonstrativos guardados (código, ano, período), em ordem cronológica"""
+        query = "SELECT codigo, ano, periodo FROM rreo"
+        params: tuple = ()
+        if codigo is not None:
+            query += " WHERE codigo = ?"
+            params = (str(codigo),)
+        with self._lock:
+            return self._db.execute(query + " ORDER BY codigo, ano, periodo", params).fetchall()
@@ -0,0 +1,48 @@
+// Leitura dos arquivos publicados pelos fetchers Python (snapshot_store.py)
+// O arquivo principal é trocado por rename atômico; se mesmo assim não puder ser
+// lido, usa o snapshot apontado por LATEST ou o mais recente disponível.
+const fs = require('fs');
+const path = require('path');
+
+function readJsonFile(filePath) {
+    return JSON.parse(fs.readFileSync(filePath, 'utf8'));
+}
+
+function listSnapshots(name) {
+    const dir = path.join(__dirname, 'snapshots', name);
+    try {
+        return fs.readdirSync(dir)
+            .filter((entry) => entry.startsWith(`${name}-`) && entry.endsWith('.json'))
+            .sort()
+            .reverse()
+            .map((entry) => path.join(dir, entry));
+    } catch (e) {
+        return [];
+    }
+}
+
+function readSnapshot(name) {
+    try {
+        return readJsonFile(path.join(__dirname, `${name}.json`));
+    } catch (mainError) {
+        const dir = path.join(__dirname, 'snapshots', name);
+        const candidates = [];
+        try {
+            candidates.push(path.join(dir, fs.readFileSync(path.join(dir, 'LATEST'), 'utf8').trim()));
+        } catch (e) {
+            // Sem ponteiro: tenta os snapshots do mais novo para o mais antigo
+        }
+        candidates.push(...listSnapshots(name));
+
+        for (const candidate of candidates) {
+            try {
+                return readJsonFile(candidate);
+            } catch (e) {
+                continue;
+            }
+        }
+        throw mainError;
+    }
+}
+
+module.exports = { readSnapshot };
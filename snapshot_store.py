@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Snapshot Store - Publicação atômica dos arquivos de saída dos fetchers
+Cada publicação grava um snapshot versionado, atualiza o ponteiro LATEST e
+substitui o arquivo principal por rename atômico, mantendo os últimos N snapshots
+"""
+
+import os
+import tempfile
+from contextlib import suppress
+from datetime import datetime
+from typing import Any, List, Optional
+
+from serialization import dumps, loads
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SNAPSHOT_ROOT = os.path.join(BASE_DIR, "snapshots")
+
+
+def atomic_write_text(path: str, text: str):
+    """Grava em arquivo temporário no mesmo diretório e troca por rename (leitores nunca veem meio arquivo)"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
+
+def atomic_write_json(path: str, data: Any, pretty: bool = False):
+    """Versão JSON de atomic_write_text"""
+    atomic_write_text(path, dumps(data, pretty))
+
+
+class SnapshotStore:
+    def __init__(self, name: str, output_path: Optional[str] = None, root: str = SNAPSHOT_ROOT, keep: int = 5):
+        self.name = name
+        self.output_path = output_path or os.path.join(BASE_DIR, f"{name}.json")
+        self.directory = os.path.join(root, name)
+        self.keep = keep
+
+    @property
+    def pointer_path(self) -> str:
+        return os.path.join(self.directory, "LATEST")
+
+    def publish(self, data: Any, pretty: bool = False) -> str:
+        """Publica um novo snapshot e o torna o arquivo principal; devolve o caminho do snapshot"""
+        text = dumps(data, pretty)
+
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        snapshot_path = os.path.join(self.directory, f"{self.name}-{stamp}-{os.getpid()}.json")
+        atomic_write_text(snapshot_path, text)
+        atomic_write_text(self.pointer_path, os.path.basename(snapshot_path))
+        atomic_write_text(self.output_path, text)
+
+        self.prune()
+        return snapshot_path
+
+    def list(self) -> List[str]:
+        """Snapshots existentes, do mais novo para o mais antigo"""
+        try:
+            names = [
+                entry for entry in os.listdir(self.directory)
+                if entry.startswith(f"{self.name}-") and entry.endswith(".json")
+            ]
+        except FileNotFoundError:
+            return []
+        return [os.path.join(self.directory, entry) for entry in sorted(names, reverse=True)]
+
+    def latest_path(self) -> Optional[str]:
+        """Snapshot apontado por LATEST (ou o mais novo, se o ponteiro estiver ausente)"""
+        try:
+            with open(self.pointer_path, encoding="utf-8") as f:
+                path = os.path.join(self.directory, f.read().strip())
+            if os.path.exists(path):
+                return path
+        except OSError:
+            pass
+        snapshots = self.list()
+        return snapshots[0] if snapshots else None
+
+    def load(self, index: int = 0) -> Optional[Any]:
+        """Carrega um snapshot (0 = mais recente, 1 = anterior, ...)"""
+        path = self.latest_path() if index == 0 else None
+        if path is None:
+            snapshots = self.list()
+            if index >= len(snapshots):
+                return None
+            path = snapshots[index]
+        with open(path, "rb") as f:
+            return loads(f.read())
+
+    def prune(self):
+        """Remove snapshots além dos `keep` mais recentes"""
+        for path in self.list()[self.keep:]:
+            with suppress(OSError):
+                os.unlink(path)
@@ -1,11 +1,54 @@
 const express = require('express');
 const OpenAI = require('openai');
 const cors = require('cors');
+const { callFetcherService } = require('./fetcher-service-client');
+const { readSnapshot } = require('./snapshot-reader');
 
 const app = express();
 app.use(cors());
 app.use(express.json());
 
+// Executa um coletor Python avulso (usado quando o Fetcher Service não está rodando)
+function runPythonScript(script, timeoutMs) {
+    const { spawn } = require('child_process');
+    const pythonProcess = spawn('python3', [script], { cwd: __dirname });
+    
+    let pythonData = '';
+    let pythonError = '';
+    
+    pythonProcess.stdout.on('data', (data) => {
+        pythonData += data.toString();
+    });
+    
+    pythonProcess.stderr.on('data', (data) => {
+        pythonError += data.toString();
+    });
+    
+    return Promise.race([
+        new Promise((resolve, reject) => {
+            pythonProcess.on('close', (code) => {
+                if (code === 0 && pythonData) {
+                    try {
+                        // Os coletores imprimem mensagens de progresso antes do JSON final
+                        const result = JSON.parse(pythonData.slice(pythonData.indexOf('{')));
+                        resolve(result);
+                    } catch (e) {
+                        reject(new Error(`Erro ao parsear saída de ${script}`));
+                    }
+                } else {
+                    reject(new Error(`Script ${script} falhou: ${pythonError}`));
+                }
+            });
+        }),
+        new Promise((_, reject) => {
+            setTimeout(() => {
+                pythonProcess.kill();
+                reject(new Error(`Timeout ${script}`));
+            }, timeoutMs);
+        })
+    ]);
+}
+
 // Initialize OpenAI with the API key from environment
 // the newest OpenAI model is "gpt-4o" which was released May 13, 2024. do not change this unless explicitly requested by the user
 const openai = new OpenAI({
@@ -110,39 +153,21 @@ app.get('/api/social-data', async (req, res) => {
     try {
         console.log('🌍 Buscando dados sociais IBGE...');
         
-        const { spawn } = require('child_process');
-        const pythonProcess = spawn('python3', ['ibge_fetcher.py']);
-        
-        let pythonData = '';
-        let pythonError = '';
-        
-        pythonProcess.stdout.on('data', (data) => {
-            pythonData += data.toString();
-        });
-        
-        pythonProcess.stderr.on('data', (data) => {
-            pythonError += data.toString();
-        });
+        // Resultado pré-calculado pelo Fetcher Service em segundo plano
+        try {
+            return res.json(readSnapshot('social_data'));
+        } catch (snapshotError) {
+            console.log('📁 Snapshot social ainda não publicado, buscando ao vivo');
+        }
         
-        const pythonResult = await Promise.race([
-            new Promise((resolve, reject) => {
-                pythonProcess.on('close', (code) => {
-                    if (code === 0 && pythonData) {
-                        try {
-                            const result = JSON.parse(pythonData);
-                            resolve(result);
-                        } catch (e) {
-                            reject(new Error('Erro ao parsear dados IBGE'));
-                        }
-                    } else {
-                        reject(new Error(`Script IBGE falhou: ${pythonError}`));
-                    }
-                });
-            }),
-            new Promise((_, reject) => {
-                setTimeout(() => reject(new Error('Timeout IBGE')), 10000);
-            })
-        ]);
+        let pythonResult;
+        try {
+            pythonResult = await callFetcherService('ibge.generate_social_comparison', {}, 10000);
+        } catch (serviceError) {
+            if (!serviceError.serviceUnavailable) throw serviceError;
+            console.log('⚠️ Fetcher Service indisponível, executando ibge_fetcher.py');
+            pythonResult = await runPythonScript('ibge_fetcher.py', 10000);
+        }
         
         console.log('✅ Dados IBGE carregados com sucesso');
         res.json(pythonResult);
@@ -200,72 +225,37 @@ app.get('/api/social-data', async (req, res) => {
 
 // Endpoint para dados de comparação municipal - com integração de dados reais
 app.get('/api/municipal-comparison', async (req, res) => {
+    // Timeout para execução do Python
+    const timeoutMs = 15000; // 15 segundos
+    
+    // Resultado pré-calculado pelo Fetcher Service em segundo plano
     try {
-        // Tentar executar script Python para buscar dados reais
-        const { spawn } = require('child_process');
-        
-        // Timeout para execução do Python
-        const timeoutMs = 15000; // 15 segundos
-        let dataReturned = false;
-        
-        const pythonProcess = spawn('python3', ['siconfi_fetcher.py'], {
-            cwd: __dirname
-        });
-        
-        let dataString = '';
-        let errorString = '';
-        
-        pythonProcess.stdout.on('data', (data) => {
-            dataString += data.toString();
-        });
-        
-        pythonProcess.stderr.on('data', (data) => {
-            errorString += data.toString();
-        });
+        return res.json(readSnapshot('municipal_comparison'));
+    } catch (snapshotError) {
+        console.log('📁 Snapshot da comparação municipal ainda não publicado, buscando ao vivo');
+    }
+    
+    try {
+        // Buscar dados reais pelo Fetcher Service (ou script Python avulso)
+        let pythonResult;
+        try {
+            pythonResult = await callFetcherService('siconfi.generate_municipal_comparison', {}, timeoutMs);
+        } catch (serviceError) {
+            if (!serviceError.serviceUnavailable) throw serviceError;
+            console.log('⚠️ Fetcher Service indisponível, executando siconfi_fetcher.py');
+            pythonResult = await runPythonScript('siconfi_fetcher.py', timeoutMs);
+        }
         
-        // Timeout para o processo Python
-        const timeout = setTimeout(() => {
-            if (!dataReturned) {
-                pythonProcess.kill();
-                console.log('⏰ Timeout no script Python, usando dados de fallback');
-                res.json(getFallbackComparisonData());
-                dataReturned = true;
-            }
-        }, timeoutMs);
+        if (!pythonResult || !pythonResult.success) {
+            console.log('📁 Comparação municipal sem dados, usando fallback');
+            return res.json(getFallbackComparisonData());
+        }
         
-        pythonProcess.on('close', (code) => {
-            if (dataReturned) return;
-            
-            clearTimeout(timeout);
-            dataReturned = true;
-            
-            if (code === 0) {
-                try {
-                    // Tentar ler dados do arquivo gerado
-                    const fs = require('fs');
-                    const path = require('path');
-                    const dataFile = path.join(__dirname, 'transparency_data.json');
-                    
-                    if (fs.existsSync(dataFile)) {
-                        const transparencyData = JSON.parse(fs.readFileSync(dataFile, 'utf8'));
-                        console.log('✅ Dados Python carregados com sucesso');
-                        res.json(transparencyData);
-                    } else {
-                        console.log('📁 Arquivo de dados não encontrado, usando fallback');
-                        res.json(getFallbackComparisonData());
-                    }
-                } catch (parseError) {
-                    console.error('❌ Erro ao processar dados Python:', parseError);
-                    res.json(getFallbackComparisonData());
-                }
-            } else {
-                console.error('❌ Script Python falhou:', errorString);
-                res.json(getFallbackComparisonData());
-            }
-        });
+        console.log('✅ Dados Python carregados com sucesso');
+        res.json(pythonResult);
         
     } catch (error) {
-        console.error('❌ Erro ao executar busca de dados:', error);
+        console.error('❌ Erro ao executar busca de dados:', error.message);
         res.json(getFallbackComparisonData());
     }
 });
@@ -400,6 +390,28 @@ app.get('/api/municipal-ranking', async (req, res) => {
     }
 });
 
+// Rankings materializados pelo Fetcher Service (top-k ou posição de um município)
+app.get('/api/rankings/:metric', async (req, res) => {
+    const { metric } = req.params;
+    const year = req.query.year ? parseInt(req.query.year, 10) : undefined;
+    
+    try {
+        const result = req.query.municipio
+            ? await callFetcherService('ranking.municipality', {
+                metric, year, municipio: req.query.municipio, k: parseInt(req.query.k || '1', 10)
+            }, 5000)
+            : await callFetcherService('ranking.top', {
+                metric, year, k: parseInt(req.query.top || '10', 10)
+            }, 5000);
+        
+        res.json({ success: true, ...result });
+        
+    } catch (error) {
+        const status = error.serviceUnavailable ? 503 : 404;
+        res.status(status).json({ success: false, error: error.message });
+    }
+});
+
 // Health check
 app.get('/api/health', (req, res) => {
     res.json({ 
@@ -416,6 +428,7 @@ app.listen(PORT, '0.0.0.0', () => {
     console.log(`   POST /api/transparency-query - Consultas com IA`);
     console.log(`   GET  /api/municipal-comparison - Comparação municipal`);
     console.log(`   GET  /api/municipal-ranking - Ranking municipal`);
+    console.log(`   GET  /api/rankings/:metric - Rankings por métrica (top, posição, vizinhos)`);
 });
 
 module.exports = app;
\ No newline at end of file
@@ -4,103 +4,106 @@ Sistema de coleta de dados reais para Transparência Pública
 Busca dados oficiais do IBGE, Portal da Transparência e outras fontes
 """
 
-import requests
-import json
+import argparse
+import sys
 import time
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from fetch_pool import fetch_concurrently, get_rate_limiter
+from ibge_aggregates import fetch_aggregate
+from municipality_registry import resolve_municipalities
+from ndjson_output import write_ndjson
+from ranking_index import MetricRanking
+from records import MunicipalIndicator
+from response_cache import cached_get
+from snapshot_store import SnapshotStore
 
 class TransparencyDataFetcher:
-    def __init__(self):
+    def __init__(self, municipalities: Optional[Iterable[str]] = None, max_workers: int = 6, requests_per_second: float = 10.0):
         self.ibge_base_url = "https://servicodados.ibge.gov.br/api/v1"
-        self.municipalities = {
-            "Monte Santo": "2922250",
-            "Cansanção": "2906303", 
-            "Uauá": "2933109",
-            "Quijingue": "2925808",
-            "Euclides da Cunha": "2910800",
-            "Senhor do Bonfim": "2930709"
-        }
+        # {nome: código IBGE} resolvido pelo cadastro compartilhado de municípios
+        self.municipalities = resolve_municipalities(municipalities)
+        # Limitador compartilhado por todas as chamadas ao IBGE (população e PIB)
+        self.max_workers = max_workers
+        self.rate_limiter = get_rate_limiter("ibge", requests_per_second)
         
-    def get_population_data(self) -> Dict:
+    def get_population_data(self) -> Dict[str, MunicipalIndicator]:
         """Busca dados populacionais do IBGE"""
         try:
-            population_data = {}
-            
-            for city, code in self.municipalities.items():
-                # API do IBGE para população estimada
-                url = f"{self.ibge_base_url}/projecoes/populacao/{code}"
-                
-                try:
-                    response = requests.get(url, timeout=10)
-                    if response.status_code == 200:
-                        data = response.json()
-                        if data and len(data) > 0:
-                            # Pega o dado mais recente
-                            latest = data[-1] if isinstance(data, list) else data
-                            population_data[city] = {
-                                "populacao": latest.get("projecao", 0),
-                                "ano": latest.get("periodo", 2024)
-                            }
-                        time.sleep(0.5)  # Rate limiting
-                except Exception as e:
-                    print(f"Erro ao buscar população de {city}: {e}")
-                    # Dados de fallback baseados em estimativas oficiais conhecidas
-                    fallback_populations = {
-                        "Monte Santo": 53000,
-                        "Cansanção": 33000,
-                        "Uauá": 25000,
-                        "Quijingue": 28000,
-                        "Euclides da Cunha": 60000,
-                        "Senhor do Bonfim": 80000
-                    }
-                    population_data[city] = {
-                        "populacao": fallback_populations.get(city, 50000),
-                        "ano": 2024
-                    }
+            calls = {
+                city: (lambda city=city, code=code: self._fetch_city_population(city, code))
+                for city, code in self.municipalities.items()
+            }
+            results = fetch_concurrently(calls, max_workers=self.max_workers)
             
-            return population_data
+            # Cidades sem resposta válida da API ficam de fora, como antes
+            return {city: data for city, data in results.items() if data}
             
         except Exception as e:
             print(f"Erro geral ao buscar dados populacionais: {e}")
             return {}
 
-    def get_economic_indicators(self) -> Dict:
+    def _fetch_city_population(self, city: str, code: str) -> Optional[MunicipalIndicator]:
+        """Busca a população estimada de um município"""
+        # API do IBGE para população estimada
+        url = f"{self.ibge_base_url}/projecoes/populacao/{code}"
+        
+        try:
+            response = cached_get(url, timeout=10, rate_limiter=self.rate_limiter)
+            if response.status_code == 200:
+                data = response.json()
+                if data and len(data) > 0:
+                    # Pega o dado mais recente
+                    latest = data[-1] if isinstance(data, list) else data
+                    return MunicipalIndicator(
+                        municipio=city,
+                        codigo=code,
+                        populacao=latest.get("projecao", 0),
+                        ano=latest.get("periodo", 2024)
+                    )
+            return None
+        except Exception as e:
+            print(f"Erro ao buscar população de {city}: {e}")
+            # Dados de fallback baseados em estimativas oficiais conhecidas
+            fallback_populations = {
+                "Monte Santo": 53000,
+                "Cansanção": 33000,
+                "Uauá": 25000,
+                "Quijingue": 28000,
+                "Euclides da Cunha": 60000,
+                "Senhor do Bonfim": 80000
+            }
+            return MunicipalIndicator(
+                municipio=city,
+                codigo=code,
+                populacao=fallback_populations.get(city, 50000),
+                ano=2024
+            )
+
+    def get_economic_indicators(self) -> Dict[str, MunicipalIndicator]:
         """Busca indicadores econômicos e sociais"""
         try:
-            # PIB municipal do IBGE (dados mais recentes disponíveis)
-            indicators = {}
+            # PIB municipal do IBGE (dados mais recentes disponíveis), todos os municípios de uma vez
+            pib_data = fetch_aggregate(
+                5938, [37], [2021], self.municipalities.values(), rate_limiter=self.rate_limiter
+            )
+            if not pib_data.get("success"):
+                print(f"Erro ao buscar indicadores: {pib_data.get('error')}")
+                # Fallback com estimativas baseadas em dados conhecidos
+                return {city: self._get_fallback_indicators(city, code) for city, code in self.municipalities.items()}
             
+            indicators = {}
             for city, code in self.municipalities.items():
-                try:
-                    # API do IBGE para PIB municipal
-                    pib_url = f"{self.ibge_base_url}/agregados/5938/periodos/2021/variaveis/37?localidades=N6[{code}]"
-                    
-                    pib_value = 0  # Inicializar variável
-                    response = requests.get(pib_url, timeout=10)
-                    if response.status_code == 200:
-                        data = response.json()
-                        
-                        if data and len(data) > 0:
-                            resultados = data[0].get("resultados", [])
-                            if resultados:
-                                series = resultados[0].get("series", [])
-                                if series:
-                                    valores = series[0].get("serie", {})
-                                    pib_value = float(valores.get("2021", "0") or "0") * 1000  # Conversão para reais
-                    
-                    indicators[city] = {
-                        "pib": pib_value,
-                        "pib_per_capita": 0,  # Será calculado depois
-                        "idh": self._get_estimated_idh(city),
-                        "gini": self._get_estimated_gini(city)
-                    }
-                    
-                    time.sleep(0.5)  # Rate limiting
-                    
-                except Exception as e:
-                    print(f"Erro ao buscar indicadores de {city}: {e}")
-                    # Fallback com estimativas baseadas em dados conhecidos
-                    indicators[city] = self._get_fallback_indicators(city)
+                valor = pib_data["data"].get(code, {}).get("37", {}).get("2021")
+                indicators[city] = MunicipalIndicator(
+                    municipio=city,
+                    codigo=code,
+                    pib=(valor or 0) * 1000,  # Conversão para reais
+                    pib_per_capita=0,  # Será calculado depois
+                    idhm=self._get_estimated_idh(city),
+                    gini=self._get_estimated_gini(city)
+                )
             
             return indicators
             
@@ -132,7 +135,7 @@ class TransparencyDataFetcher:
         }
         return gini_estimates.get(city, 0.52)
 
-    def _get_fallback_indicators(self, city: str) -> Dict:
+    def _get_fallback_indicators(self, city: str, code: str = "") -> MunicipalIndicator:
         """Dados de fallback com estimativas baseadas em fontes oficiais"""
         fallback_data = {
             "Monte Santo": {"pib": 890000000, "idh": 0.608, "gini": 0.52},
@@ -144,12 +147,14 @@ class TransparencyDataFetcher:
         }
         
         data = fallback_data.get(city, {"pib": 500000000, "idh": 0.600, "gini": 0.52})
-        return {
-            "pib": data["pib"],
-            "pib_per_capita": 0,
-            "idh": data["idh"],
-            "gini": data["gini"]
-        }
+        return MunicipalIndicator(
+            municipio=city,
+            codigo=code,
+            pib=data["pib"],
+            pib_per_capita=0,
+            idhm=data["idh"],
+            gini=data["gini"]
+        )
 
     def get_municipal_budget_estimates(self) -> Dict:
         """Estimativas de orçamento municipal baseadas no PIB e população"""
@@ -211,60 +216,100 @@ class TransparencyDataFetcher:
         }
         return budget_estimates
 
-    def generate_transparency_comparison(self) -> Dict:
-        """Gera comparação completa de transparência"""
-        try:
-            print("🔍 Buscando dados populacionais...")
+    def _ranking(self, metric: str, year: int, values: Dict[str, Optional[float]]) -> MetricRanking:
+        """Ranking da métrica entre os municípios de `values` ({nome: valor})"""
+        return MetricRanking(metric, year, [
+            (self.municipalities.get(city, city), city, value) for city, value in values.items()
+        ])
+    
+    def _neighbors_text(self, ranking: MetricRanking, municipio: str, fmt, default: str,
+                        larger_first: bool = True) -> str:
+        """ "Maior que X (...), menor que Y (...)" com os vizinhos imediatos do município no ranking"""
+        neighbors = ranking.neighbors(municipio)
+        if not neighbors["acima"] and not neighbors["abaixo"]:
+            return default
+        parts = []
+        if neighbors["abaixo"]:
+            below = neighbors["abaixo"][0]
+            parts.append(f"maior que {below['municipio']} ({fmt(below['valor'])})")
+        if neighbors["acima"]:
+            above = neighbors["acima"][-1]
+            parts.append(f"menor que {above['municipio']} ({fmt(above['valor'])})")
+        if not larger_first:
+            parts.reverse()
+        text = ", ".join(parts)
+        return text[0].upper() + text[1:]
+    
+    def iter_transparency_comparison(self) -> Iterator[Dict]:
+        """Gera cada métrica da comparação assim que os dados dela ficam prontos"""
+        print("🔍 Buscando dados populacionais e indicadores econômicos...")
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # Indicadores econômicos seguem em paralelo enquanto a população é buscada
+            economic_future = executor.submit(self.get_economic_indicators)
             population_data = self.get_population_data()
             
-            print("📊 Buscando indicadores econômicos...")
-            economic_data = self.get_economic_indicators()
-            
-            print("💰 Calculando estimativas orçamentárias...")
-            budget_data = self.get_municipal_budget_estimates()
-            
-            # Combinar todos os dados
-            comparison_data = []
-            
             # Comparação populacional
-            monte_santo_pop = population_data.get("Monte Santo", {}).get("populacao", 53000)
-            comparison_data.append({
+            populations = {city: record.populacao for city, record in population_data.items()}
+            monte_santo_pop = populations.get("Monte Santo", 53000)
+            yield {
                 "metric": "População Estimada 2024",
                 "value_monte_santo": f"{monte_santo_pop:,} habitantes".replace(",", "."),
-                "comparison_text": f"Maior que Uauá ({population_data.get('Uauá', {}).get('populacao', 25000):,}), menor que Euclides da Cunha ({population_data.get('Euclides da Cunha', {}).get('populacao', 60000):,})".replace(",", "."),
+                "comparison_text": self._neighbors_text(
+                    self._ranking("populacao", 2024, populations),
+                    "Monte Santo",
+                    lambda valor: f"{valor:,}".replace(",", "."),
+                    f"Maior que Uauá ({populations.get('Uauá', 25000):,}), menor que Euclides da Cunha ({populations.get('Euclides da Cunha', 60000):,})".replace(",", ".")
+                ),
                 "status": "good",
                 "source": "IBGE 2024"
-            })
-            
-            # Comparação de IDH
-            monte_santo_idh = economic_data.get("Monte Santo", {}).get("idh", 0.608)
-            comparison_data.append({
-                "metric": "Índice de Desenvolvimento Humano",
-                "value_monte_santo": f"{monte_santo_idh:.3f}",
-                "comparison_text": f"Acima da média regional (0.585), próximo ao estadual (0.630)",
-                "status": "warning",
-                "source": "PNUD 2021"
-            })
-            
-            # Comparação orçamentária
-            monte_santo_budget = budget_data.get("Monte Santo", {}).get("orcamento_total", 65000000)
-            comparison_data.append({
-                "metric": "Orçamento Municipal 2024",
-                "value_monte_santo": f"R$ {monte_santo_budget/1000000:.1f} milhões",
-                "comparison_text": f"Menor que Senhor do Bonfim (R$ {budget_data.get('Senhor do Bonfim', {}).get('orcamento_total', 95000000)/1000000:.0f}M), maior que Uauá (R$ {budget_data.get('Uauá', {}).get('orcamento_total', 48000000)/1000000:.0f}M)",
-                "status": "good",
-                "source": "Estimativa baseada em transferências constitucionais"
-            })
+            }
             
-            # Transparência
-            transparency_score = budget_data.get("Monte Santo", {}).get("transparencia_score", 7.2)
-            comparison_data.append({
-                "metric": "Índice de Transparência",
-                "value_monte_santo": f"{transparency_score}/10",
-                "comparison_text": f"Acima da média municipal brasileira (6.8), atrás de Senhor do Bonfim ({budget_data.get('Senhor do Bonfim', {}).get('transparencia_score', 8.1)})",
-                "status": "good",
-                "source": "Avaliação CGU/TCE-BA"
-            })
+            economic_data = economic_future.result()
+        
+        # Comparação de IDH
+        monte_santo_economic = economic_data.get("Monte Santo")
+        monte_santo_idh = monte_santo_economic.idhm if monte_santo_economic else 0.608
+        yield {
+            "metric": "Índice de Desenvolvimento Humano",
+            "value_monte_santo": f"{monte_santo_idh:.3f}",
+            "comparison_text": f"Acima da média regional (0.585), próximo ao estadual (0.630)",
+            "status": "warning",
+            "source": "PNUD 2021"
+        }
+        
+        print("💰 Calculando estimativas orçamentárias...")
+        budget_data = self.get_municipal_budget_estimates()
+        
+        # Comparação orçamentária
+        monte_santo_budget = budget_data.get("Monte Santo", {}).get("orcamento_total", 65000000)
+        yield {
+            "metric": "Orçamento Municipal 2024",
+            "value_monte_santo": f"R$ {monte_santo_budget/1000000:.1f} milhões",
+            "comparison_text": self._neighbors_text(
+                self._ranking("orcamento_total", 2024, {city: data.get("orcamento_total") for city, data in budget_data.items()}),
+                "Monte Santo",
+                lambda valor: f"R$ {valor/1000000:.0f}M",
+                f"Menor que Senhor do Bonfim (R$ {budget_data.get('Senhor do Bonfim', {}).get('orcamento_total', 95000000)/1000000:.0f}M), maior que Uauá (R$ {budget_data.get('Uauá', {}).get('orcamento_total', 48000000)/1000000:.0f}M)",
+                larger_first=False
+            ),
+            "status": "good",
+            "source": "Estimativa baseada em transferências constitucionais"
+        }
+        
+        # Transparência
+        transparency_score = budget_data.get("Monte Santo", {}).get("transparencia_score", 7.2)
+        yield {
+            "metric": "Índice de Transparência",
+            "value_monte_santo": f"{transparency_score}/10",
+            "comparison_text": f"Acima da média municipal brasileira (6.8), atrás de Senhor do Bonfim ({budget_data.get('Senhor do Bonfim', {}).get('transparencia_score', 8.1)})",
+            "status": "good",
+            "source": "Avaliação CGU/TCE-BA"
+        }
+
+    def generate_transparency_comparison(self) -> Dict:
+        """Gera comparação completa de transparência"""
+        try:
+            comparison_data = list(self.iter_transparency_comparison())
             
             print("✅ Dados de transparência gerados com sucesso!")
             return {
@@ -287,15 +332,26 @@ class TransparencyDataFetcher:
 
 def main():
     """Função principal para testar o sistema"""
+    parser = argparse.ArgumentParser(description="Coleta dados de transparência municipal")
+    parser.add_argument("--ndjson", metavar="ARQUIVO",
+                        help="grava cada métrica como uma linha JSON assim que fica pronta (- para stdout)")
+    parser.add_argument("--pretty", action="store_true", help="grava o JSON indentado (padrão: compacto)")
+    args = parser.parse_args()
+    
     fetcher = TransparencyDataFetcher()
+    
+    if args.ndjson:
+        count = write_ndjson(fetcher.iter_transparency_comparison(), args.ndjson)
+        print(f"📁 {count} métricas gravadas em NDJSON", file=sys.stderr)
+        return None
+    
     result = fetcher.generate_transparency_comparison()
     
-    # Salvar resultado em arquivo JSON
-    with open('transparency_data.json', 'w', encoding='utf-8') as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+    # Publicar resultado em arquivo JSON (troca atômica, com snapshots anteriores preservados)
+    SnapshotStore("transparency_data").publish(result, args.pretty)
     
     print("📁 Dados salvos em transparency_data.json")
     return result
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()